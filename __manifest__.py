@@ -1,6 +1,6 @@
 {
     'name': 'Project AI Solver',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.1.0',
     'category': 'Project',
     'summary': 'Real-time chat between CS agents and portal users on project tasks',
     'description': """
@@ -18,20 +18,25 @@
     'data': [
         'security/ir.model.access.csv',
         'security/security.xml',
+        'data/ir_cron_data.xml',
+        'views/project_project_views.xml',
         'views/project_task_views.xml',
         'views/project_sharing_views.xml',
         'templates/portal_task_chat.xml',
     ],
     'assets': {
         'web.assets_backend': [
+            'project_ai_solver/static/src/core/compact_history.js',
             'project_ai_solver/static/src/components/task_chat/task_chat.js',
             'project_ai_solver/static/src/components/task_chat/task_chat.xml',
             'project_ai_solver/static/src/components/task_chat/task_chat.scss',
         ],
         'web.assets_frontend': [
+            'project_ai_solver/static/src/core/compact_history.js',
             'project_ai_solver/static/src/portal/portal_chat.js',
         ],
         'project.webclient': [
+            'project_ai_solver/static/src/core/compact_history.js',
             'project_ai_solver/static/src/components/task_chat/task_chat.js',
             'project_ai_solver/static/src/components/task_chat/task_chat.xml',
             'project_ai_solver/static/src/components/task_chat/task_chat.scss',
@@ -0,0 +1,78 @@
+from werkzeug.exceptions import BadRequest
+
+from odoo import http
+from odoo.http import request, content_disposition
+from odoo.exceptions import AccessError
+
+from ..tools.chat_export import EXPORT_WRITERS, stream_chat_export
+from .portal import instrumented
+
+
+class TaskChatExport(http.Controller):
+
+    def _check_export_access(self, tasks):
+        """Chat exports are reserved to internal users who can read the tasks."""
+        if not request.env.user._is_internal():
+            raise AccessError("Only internal users can export task chats.")
+        tasks.check_access('read')
+
+    def _export_response(self, tasks, filename, fmt, attachments):
+        if fmt not in EXPORT_WRITERS:
+            raise BadRequest("Unsupported export format: %s" % fmt)
+        with_attachments = attachments in ('1', 'true', 'True')
+        writer = EXPORT_WRITERS[fmt]
+        if with_attachments:
+            filename, mimetype = '%s.zip' % filename, 'application/zip'
+        else:
+            filename, mimetype = '%s.%s' % (filename, writer.extension), writer.mimetype
+        stream = stream_chat_export(
+            request.env.registry,
+            request.env.uid,
+            dict(request.env.context),
+            tasks.ids,
+            fmt,
+            with_attachments=with_attachments,
+        )
+        response = request.make_response(stream, headers=[
+            ('Content-Type', mimetype),
+            ('Content-Disposition', content_disposition(filename)),
+        ])
+        response.direct_passthrough = True
+        return response
+
+    @http.route(
+        '/project_ai_solver/chat/export/task/<int:task_id>',
+        type='http',
+        auth='user',
+        methods=['GET'],
+        readonly=True,
+    )
+    @instrumented('chat.export')
+    def chat_export_task(self, task_id, fmt='jsonl', attachments=None, **kwargs):
+        """Stream the full chat transcript of a task."""
+        task = request.env['project.task'].browse(task_id).exists()
+        if not task or not task.channel_id:
+            raise request.not_found()
+        self._check_export_access(task)
+        return self._export_response(task, 'task-%s-chat' % task.id, fmt, attachments)
+
+    @http.route(
+        '/project_ai_solver/chat/export/project/<int:project_id>',
+        type='http',
+        auth='user',
+        methods=['GET'],
+        readonly=True,
+    )
+    @instrumented('chat.export')
+    def chat_export_project(self, project_id, fmt='jsonl', attachments=None, **kwargs):
+        """Stream the chat transcripts of all tasks of a project."""
+        project = request.env['project.project'].browse(project_id).exists()
+        if not project:
+            raise request.not_found()
+        tasks = request.env['project.task'].with_context(active_test=False).search([
+            ('project_id', '=', project.id),
+            ('channel_id', '!=', False),
+        ], order='id')
+        project.check_access('read')
+        self._check_export_access(tasks)
+        return self._export_response(tasks, 'project-%s-chats' % project.id, fmt, attachments)
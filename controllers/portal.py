@@ -1,4 +1,8 @@
 import base64
+import functools
+import gzip
+import hmac
+import json
 import logging
 
 from odoo import http
@@ -6,9 +10,55 @@ from odoo.http import request
 from odoo.exceptions import AccessError
 from odoo.addons.portal.controllers.portal import CustomerPortal
 
+from ..tools.chat_metrics import METRICS, RouteTimer
+from ..tools.compact_history import compact_history
+from ..tools.rate_limit import HISTORY_COALESCER, RATE_LIMITER
+
 _logger = logging.getLogger(__name__)
 
 MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10MB
+# Compact history responses smaller than this are not worth compressing
+GZIP_MIN_SIZE = 1024
+# Archived messages returned per /chat/archive call at most
+ARCHIVE_PAGE_SIZE = 100
+DEFAULT_METRICS_ALLOWED_IPS = '127.0.0.1,::1'
+# Token bucket settings as (requests per second, burst), overridable with the
+# ``project_ai_solver.rate_limit.<scope>`` system parameters ("rate:burst",
+# "0" to disable)
+DEFAULT_RATE_LIMITS = {
+    'user': (2.0, 20),
+    'channel': (10.0, 60),
+}
+
+
+def instrumented(route_name):
+    """Time a chat route and record it in the per-route metrics.
+
+    The active timer is exposed as ``request.chat_timer`` so that the route
+    (and the models it calls) can time individual stages. When the
+    ``project_ai_solver.server_timing`` system parameter is set, the stage
+    timings are also returned in a ``Server-Timing`` response header.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            timer = RouteTimer(route_name, request.env.cr)
+            request.chat_timer = timer
+            try:
+                response = func(self, *args, **kwargs)
+            except Exception:
+                timer.finish('error')
+                raise
+            status_code = getattr(response, 'status_code', 200)
+            timer.finish(str(status_code) if status_code >= 400 else None)
+            if request.env['ir.config_parameter'].sudo().get_param('project_ai_solver.server_timing'):
+                headers = getattr(response, 'headers', None)
+                if headers is None:
+                    headers = request.future_response.headers
+                headers['Server-Timing'] = timer.server_timing()
+            return response
+        return wrapper
+    return decorator
 
 
 class ProjectAISolverPortal(CustomerPortal):
@@ -22,11 +72,82 @@ class ProjectAISolverPortal(CustomerPortal):
         })
         return values
 
-    def _validate_portal_channel_access(self, channel_id):
+    def _get_rate_limit(self, scope):
+        """Return the (rate, burst) token bucket settings of ``scope``, or None."""
+        value = request.env['ir.config_parameter'].sudo().get_param(
+            'project_ai_solver.rate_limit.%s' % scope
+        )
+        if not value:
+            return DEFAULT_RATE_LIMITS[scope]
+        try:
+            rate, _sep, burst = value.partition(':')
+            rate = float(rate)
+            burst = int(burst) if burst else max(1, int(rate))
+        except ValueError:
+            _logger.warning("Invalid rate limit %r for scope %s, using default.", value, scope)
+            return DEFAULT_RATE_LIMITS[scope]
+        return (rate, burst) if rate > 0 else None
+
+    def _check_user_rate_limit(self, route):
+        """Consume a token from the current user's bucket of ``route``.
+
+        Charged before the channel access check, so that probing channels
+        costs the caller's own budget. Returns 0 when the request may
+        proceed, otherwise the number of seconds to wait before retrying.
+        """
+        limit = self._get_rate_limit('user')
+        if not limit:
+            return 0
+        retry_after = RATE_LIMITER.hit((request.db, route, 'user', request.env.uid), *limit)
+        if retry_after:
+            self._log_rate_limited(route, None, retry_after)
+        return retry_after
+
+    def _check_channel_rate_limit(self, route, channel_id):
+        """Consume a token from the bucket of ``channel_id`` for ``route``.
+
+        Only called once the user passed the channel access check, so that
+        nobody can exhaust the budget of a channel they do not belong to.
+        When the channel bucket rejects the request, the token taken by
+        ``_check_user_rate_limit`` is given back.
+        """
+        limit = self._get_rate_limit('channel')
+        if not limit:
+            return 0
+        retry_after = RATE_LIMITER.hit((request.db, route, 'channel', channel_id), *limit)
+        if retry_after:
+            RATE_LIMITER.refund((request.db, route, 'user', request.env.uid))
+            self._log_rate_limited(route, channel_id, retry_after)
+        return retry_after
+
+    def _log_rate_limited(self, route, channel_id, retry_after):
+        request.chat_timer.status = 'throttled'
+        _logger.debug(
+            "Rate limited %s for user %s on channel %s (retry in %.1fs)",
+            route, request.env.uid, channel_id, retry_after,
+        )
+
+    def _rate_limited_response(self, retry_after, jsonrpc=True):
+        """429 answer for ``retry_after`` seconds.
+
+        JSON-RPC responses always use HTTP 200, so JSON routes return an
+        error payload with a ``Retry-After`` header instead of a 429 status.
+        """
+        retry_after = max(1, round(retry_after))
+        payload = {'error': 'rate_limited', 'code': 429, 'retry_after': retry_after}
+        if jsonrpc:
+            request.future_response.headers['Retry-After'] = str(retry_after)
+            return payload
+        return request.make_json_response(
+            payload, headers=[('Retry-After', str(retry_after))], status=429,
+        )
+
+    def _validate_portal_channel_access(self, channel_id, auto_join=True):
         """Validate that the current portal user has access to this channel.
 
         If the user has access to the task that owns this channel but is not
-        yet a channel member, automatically add them to the channel.
+        yet a channel member, automatically add them to the channel, unless
+        ``auto_join`` is False (read-only routes).
         """
         partner = request.env.user.partner_id
         channel = request.env['discuss.channel'].sudo().browse(channel_id)
@@ -34,10 +155,7 @@ class ProjectAISolverPortal(CustomerPortal):
             raise AccessError("Channel not found.")
 
         # Check if user is already a member
-        member = channel.channel_member_ids.filtered(
-            lambda m: m.partner_id.id == partner.id
-        )
-        if member:
+        if channel._task_chat_is_member(partner):
             return channel
 
         # User is not a member - check if they have access to the task
@@ -74,24 +192,20 @@ class ProjectAISolverPortal(CustomerPortal):
         if not has_access:
             raise AccessError("You do not have access to this chat channel.")
 
-        # User has task access - add them to the channel
-        # Use try/except to handle race condition where multiple requests
-        # might try to add the same user simultaneously
-        from odoo import Command
-        from psycopg2 import IntegrityError
-        try:
-            channel.write({
-                'channel_member_ids': [Command.create({'partner_id': partner.id})]
-            })
+        if not auto_join:
+            return channel
+
+        # User has task access - add them to the channel. A concurrent first
+        # request of the same user that joined first only rolls back the
+        # insert (savepoint), not this request.
+        if channel._task_chat_insert_members([(channel.id, partner.id)]):
             _logger.info(
                 "Added portal user %s to chat channel %s for task %s",
                 partner.name, channel.name, task.name
             )
-        except IntegrityError:
-            # User was already added by another concurrent request
-            request.env.cr.rollback()
+        else:
             _logger.debug(
-                "Portal user %s already a member of channel %s (race condition)",
+                "Portal user %s already a member of channel %s (concurrent join)",
                 partner.name, channel.name
             )
 
@@ -103,9 +217,23 @@ class ProjectAISolverPortal(CustomerPortal):
         auth='user',
         methods=['POST'],
     )
+    @instrumented('chat.post')
     def chat_post_message(self, channel_id, message_body, attachment_ids=None):
         """Post a message to a task chat channel (portal user)."""
-        self._validate_portal_channel_access(channel_id)
+        timer = request.chat_timer
+        retry_after = self._check_user_rate_limit('chat.post')
+        if retry_after:
+            return self._rate_limited_response(retry_after)
+
+        with timer.stage('access'):
+            self._validate_portal_channel_access(channel_id)
+
+        retry_after = self._check_channel_rate_limit('chat.post', channel_id)
+        if retry_after:
+            return self._rate_limited_response(retry_after)
+
+        with timer.stage('archive'):
+            self._get_chat_archive(channel_id, restore=True)
 
         kwargs = {
             'body': message_body,
@@ -120,7 +248,8 @@ class ProjectAISolverPortal(CustomerPortal):
                 kwargs['attachment_ids'] = valid_attachments.ids
 
         channel = request.env['discuss.channel'].sudo().browse(channel_id)
-        channel.with_user(request.env.user).message_post(**kwargs)
+        with timer.stage('post'):
+            channel.with_user(request.env.user).message_post(**kwargs)
         return {'success': True}
 
     @http.route(
@@ -128,43 +257,163 @@ class ProjectAISolverPortal(CustomerPortal):
         type='json',
         auth='user',
         methods=['POST'],
+        readonly=True,
     )
-    def chat_history(self, channel_id, limit=50):
-        """Get message history for a task chat channel (portal user)."""
-        self._validate_portal_channel_access(channel_id)
-
-        messages = request.env['mail.message'].sudo().search_read(
-            [
-                ('model', '=', 'discuss.channel'),
-                ('res_id', '=', channel_id),
-                ('message_type', 'in', ['comment', 'notification']),
-            ],
-            fields=['body', 'author_id', 'date', 'attachment_ids'],
-            order='date asc',
-            limit=limit,
-        )
+    @instrumented('chat.history')
+    def chat_history(self, channel_id, limit=50, compact=False):
+        """Get message history for a task chat channel (portal user).
+
+        With ``compact``, the response uses the compact wire format (see
+        ``tools.compact_history``).
+        """
+        timer = request.chat_timer
+        retry_after = self._check_user_rate_limit('chat.history')
+        if retry_after:
+            return self._rate_limited_response(retry_after)
+
+        with timer.stage('access'):
+            self._validate_portal_channel_access(channel_id, auto_join=False)
+
+        retry_after = self._check_channel_rate_limit('chat.history', channel_id)
+        if retry_after:
+            return self._rate_limited_response(retry_after)
+
+        # Identical concurrent reads of a channel share a single computation
+        key = (request.db, channel_id, limit)
+        payload = HISTORY_COALESCER.run(key, lambda: self._chat_history_payload(channel_id, limit))
+        if compact:
+            with timer.stage('compact'):
+                payload = compact_history(payload)
+        return payload
+
+    @http.route(
+        '/project_ai_solver/chat/history/compact',
+        type='http',
+        auth='user',
+        methods=['GET'],
+        readonly=True,
+    )
+    @instrumented('chat.history.compact')
+    def chat_history_compact(self, channel_id, limit=50, **kwargs):
+        """Compact chat history as plain JSON, gzip-compressed when the
+        client accepts it and the payload is large enough to benefit."""
+        timer = request.chat_timer
+        channel_id, limit = int(channel_id), int(limit)
+        retry_after = self._check_user_rate_limit('chat.history')
+        if retry_after:
+            return self._rate_limited_response(retry_after, jsonrpc=False)
+
+        with timer.stage('access'):
+            self._validate_portal_channel_access(channel_id, auto_join=False)
+
+        retry_after = self._check_channel_rate_limit('chat.history', channel_id)
+        if retry_after:
+            return self._rate_limited_response(retry_after, jsonrpc=False)
 
-        # Enrich attachment data
-        for msg in messages:
-            if msg.get('attachment_ids'):
-                attachments = request.env['ir.attachment'].sudo().browse(msg['attachment_ids'])
-                existing = attachments.exists()
-                # Ensure all attachments have access tokens
-                no_token = existing.filtered(lambda a: not a.access_token)
-                if no_token:
-                    no_token.generate_access_token()
-                msg['attachments'] = [{
-                    'id': att.id,
-                    'name': att.name,
-                    'mimetype': att.mimetype,
-                    'file_size': att.file_size,
-                    'access_token': att.access_token,
-                    'is_image': att.mimetype and att.mimetype.startswith('image/'),
-                } for att in existing]
-            else:
-                msg['attachments'] = []
-
-        return {'messages': messages}
+        key = (request.db, channel_id, limit)
+        payload = HISTORY_COALESCER.run(key, lambda: self._chat_history_payload(channel_id, limit))
+        with timer.stage('compact'):
+            body = json.dumps(compact_history(payload), separators=(',', ':')).encode()
+            headers = [
+                ('Content-Type', 'application/json; charset=utf-8'),
+                ('Cache-Control', 'no-store'),
+                ('Vary', 'Accept-Encoding'),
+            ]
+            if len(body) >= GZIP_MIN_SIZE and 'gzip' in request.httprequest.accept_encodings:
+                body = gzip.compress(body, compresslevel=5)
+                headers.append(('Content-Encoding', 'gzip'))
+        return request.make_response(body, headers=headers)
+
+    def _chat_history_payload(self, channel_id, limit):
+        timer = request.chat_timer
+        with timer.stage('archive'):
+            archive = self._get_chat_archive(channel_id)
+
+        with timer.stage('messages'):
+            channel = request.env['discuss.channel'].sudo().browse(channel_id)
+            messages = channel._task_chat_read_history(limit)
+
+        return {
+            'messages': messages,
+            'archived_count': archive.message_count if archive else 0,
+        }
+
+    def _get_chat_archive(self, channel_id, restore=False):
+        """Return the chat archive of a channel.
+
+        With ``restore``, an archive whose task was reopened is moved back
+        into the channel first; read-only routes leave that to the next
+        post or archival run and keep serving it as an archive.
+        """
+        archive = request.env['project.task.chat.archive'].sudo().search([
+            ('channel_id', '=', channel_id),
+        ], limit=1)
+        if restore and archive.restore_pending:
+            archive._restore()
+            return request.env['project.task.chat.archive']
+        return archive
+
+    @http.route(
+        '/project_ai_solver/chat/archive',
+        type='json',
+        auth='user',
+        methods=['POST'],
+        readonly=True,
+    )
+    @instrumented('chat.archive')
+    def chat_archive(self, channel_id, search=None, offset=0, limit=ARCHIVE_PAGE_SIZE, compact=False):
+        """Read or search the archived messages of a task chat channel, one
+        page of at most ``ARCHIVE_PAGE_SIZE`` messages at a time.
+
+        With ``compact``, the response uses the compact wire format (see
+        ``tools.compact_history``), like the live history.
+        """
+        timer = request.chat_timer
+        offset = max(0, int(offset or 0))
+        limit = min(int(limit or ARCHIVE_PAGE_SIZE), ARCHIVE_PAGE_SIZE)
+        with timer.stage('access'):
+            self._validate_portal_channel_access(channel_id, auto_join=False)
+
+        with timer.stage('search'):
+            archive = self._get_chat_archive(channel_id)
+            messages = archive._search_transcript(search, offset, limit) if archive else []
+
+        with timer.stage('attachments'):
+            request.env['discuss.channel'].sudo().browse(channel_id)._task_chat_format_messages(messages)
+
+        payload = {
+            'messages': messages,
+            'archived_count': archive.message_count if archive else 0,
+        }
+        if compact:
+            with timer.stage('compact'):
+                payload = compact_history(payload)
+        return payload
+
+    @http.route(
+        '/project_ai_solver/chat/suggestions',
+        type='json',
+        auth='user',
+        methods=['POST'],
+        readonly=True,
+    )
+    @instrumented('chat.suggestions')
+    def chat_suggestions(self, channel_id, limit=5):
+        """Latest reply suggestions of a task chat channel (internal users)."""
+        timer = request.chat_timer
+        with timer.stage('access'):
+            if not request.env.user._is_internal():
+                raise AccessError("Reply suggestions are only available to internal users.")
+            task = request.env['project.task'].search([('channel_id', '=', channel_id)], limit=1)
+            if not task:
+                raise AccessError("You do not have access to this chat channel.")
+
+        with timer.stage('search'):
+            suggestions = request.env['project.task.chat.suggestion'].sudo().search([
+                ('channel_id', '=', channel_id),
+                ('state', '=', 'done'),
+            ], limit=limit)
+        return {'suggestions': [suggestion._to_dict() for suggestion in suggestions]}
 
     @http.route(
         '/project_ai_solver/chat/upload',
@@ -173,10 +422,21 @@ class ProjectAISolverPortal(CustomerPortal):
         methods=['POST'],
         csrf=False,
     )
+    @instrumented('chat.upload')
     def chat_upload_attachment(self, channel_id, ufile, **kwargs):
         """Upload a file attachment to a chat channel."""
+        timer = request.chat_timer
         channel_id = int(channel_id)
-        self._validate_portal_channel_access(channel_id)
+        retry_after = self._check_user_rate_limit('chat.upload')
+        if retry_after:
+            return self._rate_limited_response(retry_after, jsonrpc=False)
+
+        with timer.stage('access'):
+            self._validate_portal_channel_access(channel_id)
+
+        retry_after = self._check_channel_rate_limit('chat.upload', channel_id)
+        if retry_after:
+            return self._rate_limited_response(retry_after, jsonrpc=False)
 
         # Validate file size
         file_data = ufile.read()
@@ -191,21 +451,22 @@ class ProjectAISolverPortal(CustomerPortal):
         # and create_uid == current user. Using sudo() to bypass ACLs while
         # preserving the correct uid via the environment user.
         Attachment = request.env['ir.attachment'].sudo()
-        attachment = Attachment.create({
-            'name': ufile.filename,
-            'datas': base64.b64encode(file_data),
-            'res_model': 'mail.compose.message',
-            'res_id': 0,
-            'type': 'binary',
-        })
-        # Ensure create_uid matches the portal user (sudo creates as superuser)
-        Attachment.env.cr.execute(
-            "UPDATE ir_attachment SET create_uid = %s WHERE id = %s",
-            (request.env.user.id, attachment.id)
-        )
-        # Ensure access token exists
-        if not attachment.access_token:
-            attachment.generate_access_token()
+        with timer.stage('store'):
+            attachment = Attachment.create({
+                'name': ufile.filename,
+                'datas': base64.b64encode(file_data),
+                'res_model': 'mail.compose.message',
+                'res_id': 0,
+                'type': 'binary',
+            })
+            # Ensure create_uid matches the portal user (sudo creates as superuser)
+            Attachment.env.cr.execute(
+                "UPDATE ir_attachment SET create_uid = %s WHERE id = %s",
+                (request.env.user.id, attachment.id)
+            )
+            # Ensure access token exists
+            if not attachment.access_token:
+                attachment.generate_access_token()
 
         return request.make_json_response({
             'id': attachment.id,
@@ -215,3 +476,36 @@ class ProjectAISolverPortal(CustomerPortal):
             'access_token': attachment.access_token,
             'is_image': attachment.mimetype and attachment.mimetype.startswith('image/'),
         })
+
+    @http.route(
+        '/project_ai_solver/metrics',
+        type='http',
+        auth='public',
+        methods=['GET'],
+        save_session=False,
+        readonly=True,
+    )
+    def chat_metrics(self, **kwargs):
+        """Expose chat route metrics in Prometheus text format.
+
+        Only reachable from the addresses listed in the
+        ``project_ai_solver.metrics_allowed_ips`` system parameter
+        (comma-separated, localhost by default). Behind a reverse proxy the
+        client address is only known with ``proxy_mode``, otherwise every
+        client looks local: set ``project_ai_solver.metrics_token`` to also
+        require an ``Authorization: Bearer <token>`` header.
+        """
+        ICP = request.env['ir.config_parameter'].sudo()
+        allowed = ICP.get_param('project_ai_solver.metrics_allowed_ips', DEFAULT_METRICS_ALLOWED_IPS)
+        allowed_ips = {ip.strip() for ip in allowed.split(',') if ip.strip()}
+        if request.httprequest.remote_addr not in allowed_ips:
+            return request.make_response('Forbidden', status=403)
+        token = ICP.get_param('project_ai_solver.metrics_token')
+        if token:
+            scheme, _sep, given = request.httprequest.headers.get('Authorization', '').partition(' ')
+            if scheme.lower() != 'bearer' or not hmac.compare_digest(given.strip(), token):
+                return request.make_response('Forbidden', status=403)
+        return request.make_response(
+            METRICS.render_prometheus(),
+            headers=[('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')],
+        )
@@ -0,0 +1,33 @@
+import logging
+
+from odoo import api, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def migrate(cr, version):
+    """Issue access tokens for existing task chat attachments.
+
+    Tokens used to be generated lazily by the chat history route; they are
+    now generated on upload/post so that history reads never write.
+    """
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    channels = env['project.task'].with_context(active_test=False).search([
+        ('channel_id', '!=', False),
+    ]).channel_id
+    if not channels:
+        return
+    Attachment = env['ir.attachment']
+    domain = [
+        ('res_model', '=', 'discuss.channel'),
+        ('res_id', 'in', channels.ids),
+        ('access_token', '=', False),
+    ]
+    total = 0
+    while attachments := Attachment.search(domain, limit=BATCH_SIZE):
+        attachments.generate_access_token()
+        total += len(attachments)
+        env.invalidate_all()
+    _logger.info("Generated access tokens for %d task chat attachments", total)
@@ -1,2 +1,8 @@
+from . import ir_attachment
+from . import mail_message
+from . import project_collaborator
+from . import project_project
 from . import project_task
+from . import project_task_chat_archive
+from . import project_task_chat_suggestion
 from . import discuss_channel
@@ -1,20 +1,146 @@
 import logging
+from datetime import datetime
 
-from odoo import models
+from psycopg2.errors import UniqueViolation
+
+from odoo import api, models, fields
+from odoo.http import request
+from odoo.tools import mute_logger
+
+from ..tools.chat_metrics import RouteTimer, stage
 
 _logger = logging.getLogger(__name__)
 
+# Number of latest messages kept in the per-channel history snapshot
+SNAPSHOT_SIZE = 100
+CHAT_MESSAGE_TYPES = ['comment', 'notification']
+CHAT_MESSAGE_FIELDS = ['body', 'author_id', 'date', 'attachment_ids']
+
 
 class DiscussChannel(models.Model):
     _inherit = 'discuss.channel'
 
+    task_chat_snapshot = fields.Json(
+        string='Task Chat Snapshot',
+        copy=False,
+        # Only loaded by the history read and append, not with every channel read
+        prefetch=False,
+        help="Serialized latest task chat messages, as returned by the chat "
+             "history endpoint. Empty when it has to be rebuilt.",
+    )
+
     def message_post(self, **kwargs):
-        message = super().message_post(**kwargs)
-        # Only notify for task-chat group channels
-        if self.channel_type == 'group' and self.name and self.name.startswith('Task Chat:'):
-            self._notify_task_chat_members()
+        timer = RouteTimer('discuss.channel.message_post', self.env.cr)
+        # Stages are also reported on the enclosing chat route, if any
+        route_timer = getattr(request, 'chat_timer', None) if request else None
+        try:
+            if kwargs.get('attachment_ids') and self._is_task_chat():
+                # Tokens are issued on write so that history reads stay
+                # read-only. Issued before posting: once linked to the
+                # channel, writing the attachments invalidates the snapshot.
+                # Only on the attachments the post will link (same filter as
+                # ``_process_attachments_for_post``), never on arbitrary ids.
+                self.env['ir.attachment'].sudo().search([
+                    ('id', 'in', kwargs['attachment_ids']),
+                    ('res_model', '=', 'mail.compose.message'),
+                    ('create_uid', '=', self.env.uid),
+                    ('access_token', '=', False),
+                ]).generate_access_token()
+            with timer.stage('post'):
+                message = super().message_post(**kwargs)
+            # Only notify for task-chat group channels
+            if self._is_task_chat():
+                with timer.stage('snapshot'), stage(route_timer, 'snapshot'):
+                    # Attachments created by the post itself (``attachments``
+                    # kwarg) still need one, at the cost of a snapshot rebuild
+                    message.attachment_ids.sudo().filtered(
+                        lambda a: not a.access_token
+                    ).generate_access_token()
+                    self._task_chat_snapshot_append(message)
+                with timer.stage('notify'), stage(route_timer, 'notify'):
+                    self._notify_task_chat_members()
+                # Customer messages get reply suggestions, computed off the request path
+                if message.author_id.partner_share and message.message_type == 'comment':
+                    with timer.stage('suggest'), stage(route_timer, 'suggest'):
+                        self.env['project.task.chat.suggestion']._enqueue(message, self)
+        except Exception:
+            timer.finish('error')
+            raise
+        timer.finish()
         return message
 
+    def _message_update_content(self, message, *args, **kwargs):
+        res = super()._message_update_content(message, *args, **kwargs)
+        self._task_chat_snapshot_invalidate()
+        return res
+
+    def _task_chat_is_member(self, partner):
+        """Whether ``partner`` is a member of the channel, as a single query."""
+        self.ensure_one()
+        return bool(self.env['discuss.channel.member'].sudo().search_count([
+            ('channel_id', '=', self.id),
+            ('partner_id', '=', partner.id),
+        ], limit=1))
+
+    @api.model
+    def _task_chat_insert_members(self, channel_partner_pairs):
+        """Add members given as ``(channel_id, partner_id)`` pairs, skipping
+        existing ones. Returns the ``(channel_id, partner_id)`` pairs
+        actually added.
+
+        Members are created through the ORM, so that they get the same
+        defaults as members added by Discuss. A concurrent transaction may
+        add the same member meanwhile, unseen by this one's snapshot: the
+        unique (channel, partner) index then makes the insert fail with a
+        unique violation, which only rolls back to a savepoint and counts
+        as already a member, so the request carries on. Serialization
+        failures are left to Odoo's request retry.
+        """
+        pairs = list(dict.fromkeys(channel_partner_pairs))
+        if not pairs:
+            return []
+        existing = self._task_chat_member_pairs(pairs)
+        missing = [pair for pair in pairs if pair not in existing]
+        if not missing:
+            return []
+        if self._task_chat_create_members(missing):
+            return missing
+        # Some of them joined concurrently: add the others one by one
+        return [pair for pair in missing if self._task_chat_create_members([pair])]
+
+    @api.model
+    def _task_chat_member_pairs(self, channel_partner_pairs):
+        """Return the set of the given ``(channel_id, partner_id)`` pairs
+        that are already members."""
+        channel_ids, partner_ids = zip(*channel_partner_pairs)
+        members = self.env['discuss.channel.member'].sudo().search_read(
+            [('channel_id', 'in', list(channel_ids)), ('partner_id', 'in', list(partner_ids))],
+            fields=['channel_id', 'partner_id'],
+            load=False,
+        )
+        return {(m['channel_id'], m['partner_id']) for m in members}
+
+    @api.model
+    def _task_chat_create_members(self, channel_partner_pairs):
+        """Create the given members in a savepoint; return False if one of
+        them was added by a concurrent transaction."""
+        Member = self.env['discuss.channel.member'].sudo()
+        try:
+            with mute_logger('odoo.sql_db'), self.env.cr.savepoint():
+                Member.create([
+                    {'channel_id': channel_id, 'partner_id': partner_id}
+                    for channel_id, partner_id in channel_partner_pairs
+                ])
+        except UniqueViolation:
+            _logger.debug("Concurrent join of task chat members %s", channel_partner_pairs)
+            Member.invalidate_model()
+            self.env['discuss.channel'].invalidate_model(['channel_member_ids'])
+            return False
+        return True
+
+    def _is_task_chat(self):
+        return self.channel_type == 'group' and self.name and self.name.startswith('Task Chat:')
+
     def _notify_task_chat_members(self):
         """Send bus notification to all channel members about a new chat message."""
         for member in self.channel_member_ids:
@@ -23,3 +149,86 @@ class DiscussChannel(models.Model):
                 'project_ai_solver/new_message',
                 {'channel_id': self.id},
             )
+
+    # ------------------------------------------------------------
+    # Task chat history
+    # ------------------------------------------------------------
+
+    def _task_chat_search_messages(self, limit):
+        """Return the latest ``limit`` chat messages as dicts, oldest first."""
+        self.ensure_one()
+        messages = self.env['mail.message'].sudo().search_read(
+            [
+                ('model', '=', 'discuss.channel'),
+                ('res_id', '=', self.id),
+                ('message_type', 'in', CHAT_MESSAGE_TYPES),
+            ],
+            fields=CHAT_MESSAGE_FIELDS,
+            order='date desc, id desc',
+            limit=limit,
+        )
+        messages.reverse()
+        return messages
+
+    def _task_chat_format_messages(self, messages):
+        """Make message dicts JSON-ready and add an ``attachments`` list of
+        display dicts to each of them.
+
+        Side-effect free: access tokens are issued when attachments are
+        uploaded or posted, never here.
+        """
+        Attachment = self.env['ir.attachment'].sudo()
+        for msg in messages:
+            if isinstance(msg.get('date'), datetime):
+                msg['date'] = fields.Datetime.to_string(msg['date'])
+            if msg.get('attachment_ids'):
+                existing = Attachment.browse(msg['attachment_ids']).exists()
+                msg['attachments'] = [{
+                    'id': att.id,
+                    'name': att.name,
+                    'mimetype': att.mimetype,
+                    'file_size': att.file_size,
+                    'access_token': att.access_token,
+                    'is_image': att.mimetype and att.mimetype.startswith('image/'),
+                } for att in existing]
+            else:
+                msg['attachments'] = []
+        return messages
+
+    def _task_chat_read_history(self, limit):
+        """Return the latest ``limit`` serialized messages of the channel.
+
+        Served from the snapshot when it covers the requested window,
+        otherwise from a search. Never writes, so that it can run on a
+        read-only cursor; the snapshot is (re)built by ``message_post``.
+        """
+        self.ensure_one()
+        snapshot = self.task_chat_snapshot
+        if snapshot and limit and limit <= SNAPSHOT_SIZE:
+            return snapshot[-limit:]
+        return self._task_chat_format_messages(self._task_chat_search_messages(limit))
+
+    def _task_chat_snapshot_rebuild(self):
+        self.ensure_one()
+        snapshot = self._task_chat_format_messages(self._task_chat_search_messages(SNAPSHOT_SIZE))
+        self.sudo().task_chat_snapshot = snapshot
+        return snapshot
+
+    def _task_chat_snapshot_append(self, message):
+        """Add a freshly posted message to the snapshot, rebuilding the
+        snapshot instead if it was invalidated."""
+        self.ensure_one()
+        if message.message_type not in CHAT_MESSAGE_TYPES:
+            return
+        snapshot = self.task_chat_snapshot
+        if not snapshot:
+            self._task_chat_snapshot_rebuild()
+            return
+        values = message.sudo().read(CHAT_MESSAGE_FIELDS)
+        snapshot = snapshot + self._task_chat_format_messages(values)
+        self.sudo().task_chat_snapshot = snapshot[-SNAPSHOT_SIZE:]
+
+    def _task_chat_snapshot_invalidate(self):
+        channels = self.sudo().filtered('task_chat_snapshot')
+        if channels:
+            channels.task_chat_snapshot = False
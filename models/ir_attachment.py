@@ -0,0 +1,27 @@
+from odoo import models
+
+
+class IrAttachment(models.Model):
+    _inherit = 'ir.attachment'
+
+    def _task_chat_channels(self):
+        """Channels whose chat history displays one of these attachments."""
+        channel_ids = {
+            attachment.res_id for attachment in self.sudo()
+            if attachment.res_model == 'discuss.channel' and attachment.res_id
+        }
+        return self.env['discuss.channel'].browse(channel_ids)
+
+    def write(self, vals):
+        # Attachments newly linked to a channel come with a posted message,
+        # which updates the snapshot itself
+        channels = self._task_chat_channels()
+        res = super().write(vals)
+        channels.exists()._task_chat_snapshot_invalidate()
+        return res
+
+    def unlink(self):
+        channels = self._task_chat_channels()
+        res = super().unlink()
+        channels.exists()._task_chat_snapshot_invalidate()
+        return res
@@ -0,0 +1,15 @@
+from odoo import models
+
+
+class MailMessage(models.Model):
+    _inherit = 'mail.message'
+
+    def unlink(self):
+        channel_ids = {
+            message.res_id for message in self.sudo()
+            if message.model == 'discuss.channel' and message.res_id
+        }
+        res = super().unlink()
+        if channel_ids:
+            self.env['discuss.channel'].browse(channel_ids).exists()._task_chat_snapshot_invalidate()
+        return res
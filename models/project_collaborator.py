@@ -0,0 +1,17 @@
+from odoo import models, api
+
+
+class ProjectCollaborator(models.Model):
+    _inherit = 'project.collaborator'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        collaborators = super().create(vals_list)
+        collaborators.project_id._sync_task_chat_members()
+        return collaborators
+
+    def unlink(self):
+        projects = self.project_id
+        res = super().unlink()
+        projects._sync_task_chat_members()
+        return res
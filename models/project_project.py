@@ -0,0 +1,34 @@
+from odoo import models, fields
+
+
+class ProjectProject(models.Model):
+    _inherit = 'project.project'
+
+    chat_archive_enabled = fields.Boolean(
+        string='Archive Old Task Chats',
+        help="Move the chat messages of closed tasks into a compressed archive "
+             "once the retention period has passed.",
+    )
+    chat_retention_days = fields.Integer(
+        string='Chat Retention (Days)',
+        default=90,
+        help="Days after a task was closed before its chat is archived.",
+    )
+
+    def action_export_task_chats(self):
+        """Download the chat transcripts of all tasks of the project."""
+        self.ensure_one()
+        fmt = self.env.context.get('chat_export_format', 'jsonl')
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/project_ai_solver/chat/export/project/%s?fmt=%s&attachments=1' % (self.id, fmt),
+            'target': 'download',
+        }
+
+    def _sync_task_chat_members(self):
+        """Sync the chat members of every chat-enabled task of the projects."""
+        tasks = self.env['project.task'].sudo().search([
+            ('project_id', 'in', self.ids),
+            ('channel_id', '!=', False),
+        ])
+        tasks._sync_chat_members()
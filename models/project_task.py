@@ -1,9 +1,13 @@
 import logging
 
 from odoo import models, fields, api, Command
+from odoo.addons.project.models.project_task import CLOSED_STATES
 
 _logger = logging.getLogger(__name__)
 
+# Task fields that define who may take part in the task chat
+CHAT_MEMBER_FIELDS = {'user_ids', 'partner_id', 'project_id'}
+
 
 class ProjectTask(models.Model):
     _inherit = 'project.task'
@@ -17,6 +21,21 @@ class ProjectTask(models.Model):
         string='Chat Channel',
         ondelete='set null',
     )
+    date_closed = fields.Datetime(
+        string='Closed On',
+        compute='_compute_date_closed',
+        store=True,
+        copy=False,
+        help="When the task was last closed; starts the chat retention period.",
+    )
+
+    @api.depends('state')
+    def _compute_date_closed(self):
+        for task in self:
+            if task.state not in CLOSED_STATES:
+                task.date_closed = False
+            elif not task.date_closed:
+                task.date_closed = fields.Datetime.now()
 
     @property
     def SELF_READABLE_FIELDS(self):
@@ -55,10 +74,99 @@ class ProjectTask(models.Model):
         self.channel_id = channel
         return channel
 
+    def action_export_chat(self):
+        """Download the full chat transcript of the task."""
+        self.ensure_one()
+        fmt = self.env.context.get('chat_export_format', 'html')
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/project_ai_solver/chat/export/task/%s?fmt=%s&attachments=1' % (self.id, fmt),
+            'target': 'download',
+        }
+
     def write(self, vals):
         res = super().write(vals)
         if vals.get('chat_enabled'):
             for task in self:
                 if task.chat_enabled and not task.channel_id:
                     task._create_chat_channel()
+        if vals.get('chat_enabled') or CHAT_MEMBER_FIELDS & vals.keys():
+            self._sync_chat_members()
+        if 'state' in vals and vals['state'] not in CLOSED_STATES:
+            self._mark_chat_archive_for_restore()
+        return res
+
+    def _mark_chat_archive_for_restore(self):
+        """Flag archived chats of reopened tasks; they are restored lazily."""
+        channels = self.channel_id
+        if channels:
+            self.env['project.task.chat.archive'].sudo().search([
+                ('channel_id', 'in', channels.ids),
+                ('restore_pending', '=', False),
+            ]).restore_pending = True
+
+    def message_subscribe(self, partner_ids=None, subtype_ids=None):
+        res = super().message_subscribe(partner_ids=partner_ids, subtype_ids=subtype_ids)
+        if partner_ids:
+            self._sync_chat_members()
+        return res
+
+    def message_unsubscribe(self, partner_ids=None):
+        res = super().message_unsubscribe(partner_ids=partner_ids)
+        if partner_ids:
+            self._sync_chat_members()
         return res
+
+    def _get_chat_member_partners(self):
+        """Partners entitled to the task chat: assignees, customer, followers
+        and project collaborators (same rules as the portal access check)."""
+        self.ensure_one()
+        return (
+            self.user_ids.partner_id
+            | self.partner_id
+            | self.message_partner_ids
+            | self.project_id.collaborator_ids.partner_id
+        )
+
+    def _sync_chat_members(self):
+        """Bring the chat channel members of these tasks in line with their
+        participants, in one batch.
+
+        Missing participants are added; external partners (customers,
+        portal users) who are no longer participants are removed. Internal
+        users are never removed since they reach the chat from the backend.
+        """
+        tasks = self.sudo().filtered('channel_id')
+        if not tasks:
+            return
+        Member = self.env['discuss.channel.member'].sudo()
+        members = Member.search_read(
+            [('channel_id', 'in', tasks.channel_id.ids), ('partner_id', '!=', False)],
+            fields=['channel_id', 'partner_id'],
+            load=False,
+        )
+        current = {(m['channel_id'], m['partner_id']): m['id'] for m in members}
+
+        desired = set()
+        for task in tasks:
+            desired.update(
+                (task.channel_id.id, partner_id)
+                for partner_id in task._get_chat_member_partners().ids
+            )
+
+        to_add = sorted(desired - current.keys())
+        stale = [pair for pair in current if pair not in desired]
+        external = set(
+            self.env['res.partner'].sudo().browse({p for _c, p in stale}).filtered('partner_share').ids
+        )
+        to_remove = [current[pair] for pair in stale if pair[1] in external]
+
+        if to_add:
+            self.env['discuss.channel']._task_chat_insert_members(to_add)
+        if to_remove:
+            Member.browse(to_remove).unlink()
+        if to_add or to_remove:
+            _logger.debug(
+                "Task chat member sync: %d added, %d removed on %d channel(s)",
+                len(to_add), len(to_remove), len(tasks.channel_id),
+            )
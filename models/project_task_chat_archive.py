@@ -0,0 +1,224 @@
+import base64
+import codecs
+import itertools
+import json
+import logging
+import zlib
+
+from odoo import models, fields, api
+from odoo.tools import html2plaintext
+from odoo.addons.project.models.project_task import CLOSED_STATES
+
+_logger = logging.getLogger(__name__)
+
+ARCHIVED_MESSAGE_TYPES = ['comment', 'notification']
+# Compressed bytes fed to the decompressor at a time when reading a transcript
+TRANSCRIPT_CHUNK_SIZE = 64 * 1024
+
+
+class ProjectTaskChatArchive(models.Model):
+    _name = 'project.task.chat.archive'
+    _description = 'Archived Task Chat Transcript'
+    _order = 'date_last desc, id desc'
+
+    task_id = fields.Many2one(
+        'project.task',
+        string='Task',
+        required=True,
+        index=True,
+        ondelete='cascade',
+    )
+    channel_id = fields.Many2one(
+        'discuss.channel',
+        string='Chat Channel',
+        required=True,
+        index=True,
+        ondelete='cascade',
+    )
+    transcript = fields.Binary(
+        string='Transcript',
+        attachment=True,
+        help="zlib-compressed JSON list of the archived messages.",
+    )
+    message_count = fields.Integer(string='Messages', readonly=True)
+    date_first = fields.Datetime(string='First Message', readonly=True)
+    date_last = fields.Datetime(string='Last Message', readonly=True)
+    restore_pending = fields.Boolean(
+        string='Restore Pending',
+        help="The task was reopened; messages are moved back to the channel "
+             "on the next chat access or archival run.",
+    )
+
+    _sql_constraints = [
+        ('channel_uniq', 'unique(channel_id)', 'A chat channel can only have one archive.'),
+    ]
+
+    @api.model
+    def _serialize_message(self, message):
+        return {
+            'id': message.id,
+            'body': message.body or '',
+            'author_id': [message.author_id.id, message.author_id.display_name] if message.author_id else False,
+            'email_from': message.email_from or False,
+            'date': fields.Datetime.to_string(message.date),
+            'message_type': message.message_type,
+            'subtype_id': message.subtype_id.id or False,
+            'attachment_ids': message.attachment_ids.ids,
+        }
+
+    def _read_transcript(self):
+        """Return the archived messages, oldest first."""
+        return list(self._iter_transcript())
+
+    def _iter_transcript(self, chunk_size=TRANSCRIPT_CHUNK_SIZE):
+        """Yield the archived messages one by one, oldest first.
+
+        The transcript is decompressed and parsed incrementally, so only
+        the compressed data and the messages of one chunk are in memory.
+        """
+        self.ensure_one()
+        if not self.transcript:
+            return
+        raw = base64.b64decode(self.with_context(bin_size=False).transcript)
+        decompressor = zlib.decompressobj()
+        text = codecs.getincrementaldecoder('utf-8')()
+        decoder = json.JSONDecoder()
+        buffer = ''
+        chunks = (raw[offset:offset + chunk_size] for offset in range(0, len(raw), chunk_size))
+        # A final empty chunk flushes the decompressor
+        for chunk in itertools.chain(chunks, [b'']):
+            data = decompressor.decompress(chunk) if chunk else decompressor.flush()
+            buffer += text.decode(data, final=not chunk)
+            pos = 0
+            while True:
+                # Skip the list punctuation around and between messages
+                while pos < len(buffer) and buffer[pos] in '[,] \t\r\n':
+                    pos += 1
+                if pos == len(buffer):
+                    break
+                try:
+                    message, pos = decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    # The message continues in the next chunk
+                    break
+                yield message
+            buffer = buffer[pos:]
+        if buffer.strip():
+            raise ValueError("Truncated chat transcript in archive %s" % self.id)
+
+    def _write_transcript(self, messages):
+        self.ensure_one()
+        payload = zlib.compress(json.dumps(messages, separators=(',', ':')).encode(), 9)
+        self.write({
+            'transcript': base64.b64encode(payload),
+            'message_count': len(messages),
+            'date_first': messages[0]['date'] if messages else False,
+            'date_last': messages[-1]['date'] if messages else False,
+        })
+
+    @api.model
+    def _archive_channel(self, task):
+        """Move the chat messages of ``task`` into its compressed archive.
+
+        Returns the number of archived messages.
+        """
+        channel = task.channel_id
+        Message = self.env['mail.message'].sudo()
+        messages = Message.search([
+            ('model', '=', 'discuss.channel'),
+            ('res_id', '=', channel.id),
+            ('message_type', 'in', ARCHIVED_MESSAGE_TYPES),
+        ], order='date asc, id asc')
+        if not messages:
+            return 0
+
+        archive = self.sudo().search([('channel_id', '=', channel.id)], limit=1)
+        if not archive:
+            archive = self.sudo().create({'task_id': task.id, 'channel_id': channel.id})
+        transcript = archive._read_transcript() + [self._serialize_message(m) for m in messages]
+        archive._write_transcript(transcript)
+        archive.restore_pending = False
+        count = len(messages)
+        messages.unlink()
+        _logger.info(
+            "Archived %d chat messages of task %s (channel %s)",
+            count, task.display_name, channel.id,
+        )
+        return count
+
+    def _restore(self):
+        """Recreate the archived messages in their channel and drop the archive."""
+        Message = self.env['mail.message'].sudo()
+        Attachment = self.env['ir.attachment'].sudo()
+        for archive in self.sudo():
+            values = []
+            for msg in archive._read_transcript():
+                attachments = Attachment.browse(msg['attachment_ids']).exists()
+                values.append({
+                    'model': 'discuss.channel',
+                    'res_id': archive.channel_id.id,
+                    'body': msg['body'],
+                    'author_id': msg['author_id'] and msg['author_id'][0],
+                    'email_from': msg['email_from'],
+                    'date': msg['date'],
+                    'message_type': msg['message_type'],
+                    'subtype_id': msg['subtype_id'],
+                    'attachment_ids': [(6, 0, attachments.ids)],
+                })
+            Message.create(values)
+            archive.channel_id._task_chat_snapshot_invalidate()
+            _logger.info(
+                "Restored %d archived chat messages of task %s (channel %s)",
+                len(values), archive.task_id.display_name, archive.channel_id.id,
+            )
+        self.sudo().unlink()
+
+    def _search_transcript(self, search=None, offset=0, limit=None):
+        """Return archived messages matching ``search`` (body or author name)."""
+        self.ensure_one()
+        messages = self._iter_transcript()
+        if search:
+            term = search.lower()
+            messages = (
+                msg for msg in messages
+                if term in html2plaintext(msg['body']).lower()
+                or (msg['author_id'] and term in msg['author_id'][1].lower())
+            )
+        end = offset + limit if limit else None
+        return list(itertools.islice(messages, offset, end))
+
+    @api.model
+    def _cron_archive_task_chats(self, batch_size=100):
+        """Restore archives of reopened tasks, then archive the chats of closed
+        tasks that are past their project's retention period."""
+        self.search([('restore_pending', '=', True)], limit=batch_size)._restore()
+
+        Task = self.env['project.task']
+        tasks = Task
+        for project in self.env['project.project'].search([('chat_archive_enabled', '=', True)]):
+            cutoff = fields.Datetime.subtract(fields.Datetime.now(), days=project.chat_retention_days)
+            tasks |= Task.search([
+                ('project_id', '=', project.id),
+                ('channel_id', '!=', False),
+                ('state', 'in', list(CLOSED_STATES)),
+                ('date_closed', '<', cutoff),
+            ])
+        if not tasks:
+            return
+
+        # Only tasks that still have live messages need work
+        live_channel_ids = {
+            res_id for [res_id] in self.env['mail.message'].sudo()._read_group(
+                [
+                    ('model', '=', 'discuss.channel'),
+                    ('res_id', 'in', tasks.channel_id.ids),
+                    ('message_type', 'in', ARCHIVED_MESSAGE_TYPES),
+                ],
+                groupby=['res_id'],
+            )
+        }
+        tasks = tasks.filtered(lambda t: t.channel_id.id in live_channel_ids)
+        for task in tasks[:batch_size]:
+            self._archive_channel(task)
+        if len(tasks) > batch_size:
+            self.env['ir.cron']._notify_progress(done=batch_size, remaining=len(tasks) - batch_size)
@@ -0,0 +1,162 @@
+import logging
+import time
+
+from odoo import models, fields, api
+from odoo.tools import html2plaintext
+
+_logger = logging.getLogger(__name__)
+
+# Stop processing the queue after this many seconds in a cron run
+PROCESS_TIME_BUDGET = 60
+
+STUB_CATEGORIES = [
+    ('urgent', ('urgent', 'asap', 'immediately', 'emergency')),
+    ('billing', ('invoice', 'payment', 'refund', 'price', 'bill')),
+    ('bug', ('error', 'bug', 'crash', 'broken', 'not working', 'fail')),
+    ('question', ('how', 'what', 'why', 'when', 'where', '?')),
+]
+
+STUB_REPLIES = {
+    'urgent': "Thanks for flagging this, we are looking into it right away.",
+    'billing': "Thanks for your message, I am checking the billing details and will get back to you shortly.",
+    'bug': "Sorry for the trouble. Could you share the steps to reproduce and a screenshot of the error?",
+    'question': "Good question, let me check and get back to you.",
+    'general': "Thanks for your message, we will get back to you soon.",
+}
+
+
+class ProjectTaskChatSuggestion(models.Model):
+    _name = 'project.task.chat.suggestion'
+    _description = 'Task Chat Reply Suggestion'
+    _order = 'id desc'
+
+    message_id = fields.Many2one(
+        'mail.message',
+        string='Message',
+        required=True,
+        ondelete='cascade',
+    )
+    channel_id = fields.Many2one(
+        'discuss.channel',
+        string='Chat Channel',
+        required=True,
+        index=True,
+        ondelete='cascade',
+    )
+    state = fields.Selection(
+        [('queued', 'Queued'), ('done', 'Done'), ('failed', 'Failed')],
+        string='Status',
+        default='queued',
+        required=True,
+        index=True,
+    )
+    backend = fields.Char(string='Backend', readonly=True)
+    category = fields.Char(string='Category', readonly=True)
+    suggested_reply = fields.Text(string='Suggested Reply', readonly=True)
+    error = fields.Text(string='Error', readonly=True)
+
+    _sql_constraints = [
+        ('message_uniq', 'unique(message_id)', 'A message can only have one suggestion.'),
+    ]
+
+    @api.model
+    def _get_backend(self):
+        """Name of the configured suggestion backend, empty when disabled.
+
+        A backend ``<name>`` is a ``_suggest_batch_<name>`` method taking
+        the list of message texts of a batch and returning one
+        ``{'category': ..., 'reply': ...}`` dict per text.
+        """
+        return self.env['ir.config_parameter'].sudo().get_param('project_ai_solver.suggestion_backend', '')
+
+    @api.model
+    def _enqueue(self, message, channel):
+        """Queue a customer message for suggestion; called on the post path,
+        so it only inserts a row and wakes up the processing cron."""
+        if not self._get_backend():
+            return self.browse()
+        suggestion = self.sudo().create({'message_id': message.id, 'channel_id': channel.id})
+        self.env.ref('project_ai_solver.ir_cron_process_chat_suggestions').sudo()._trigger()
+        return suggestion
+
+    @api.model
+    def _suggest_batch_stub(self, texts):
+        """Offline keyword-based backend, for tests and demos."""
+        results = []
+        for text in texts:
+            lowered = text.lower()
+            category = next(
+                (name for name, keywords in STUB_CATEGORIES if any(k in lowered for k in keywords)),
+                'general',
+            )
+            results.append({'category': category, 'reply': STUB_REPLIES[category]})
+        return results
+
+    def _process(self):
+        """Run the configured backend on these queued suggestions as one batch."""
+        backend = self._get_backend()
+        suggest = getattr(self, '_suggest_batch_%s' % backend, None)
+        if not suggest:
+            self.write({'state': 'failed', 'backend': backend, 'error': "Unknown suggestion backend."})
+            return
+        texts = [html2plaintext(suggestion.message_id.body or '') for suggestion in self]
+        try:
+            results = list(suggest(texts))
+        except Exception as e:
+            _logger.exception("Chat suggestion backend %s failed", backend)
+            self.write({'state': 'failed', 'backend': backend, 'error': str(e)})
+            return
+        if len(results) != len(self):
+            _logger.warning(
+                "Chat suggestion backend %s returned %d results for %d messages",
+                backend, len(results), len(self),
+            )
+        for suggestion, result in zip(self, results):
+            suggestion.write({
+                'state': 'done',
+                'backend': backend,
+                'category': result.get('category'),
+                'suggested_reply': result.get('reply'),
+            })
+        # Left queued, they would be picked up again by every cron batch
+        self[len(results):].write({
+            'state': 'failed',
+            'backend': backend,
+            'error': "The backend returned no result for this message.",
+        })
+        self._notify_agents()
+
+    def _notify_agents(self):
+        """Push finished suggestions to the internal members of their channel."""
+        for suggestion in self.filtered(lambda s: s.state == 'done'):
+            agents = suggestion.channel_id.channel_member_ids.partner_id.filtered(lambda p: not p.partner_share)
+            payload = suggestion._to_dict()
+            for partner in agents:
+                self.env['bus.bus']._sendone(partner, 'project_ai_solver/suggestion', payload)
+
+    def _to_dict(self):
+        self.ensure_one()
+        return {
+            'id': self.id,
+            'channel_id': self.channel_id.id,
+            'message_id': self.message_id.id,
+            'category': self.category,
+            'suggested_reply': self.suggested_reply,
+        }
+
+    @api.model
+    def _cron_process_suggestions(self, batch_size=20):
+        """Process the suggestion queue in batches, within a time budget."""
+        start = time.monotonic()
+        done = 0
+        while time.monotonic() - start < PROCESS_TIME_BUDGET:
+            batch = self.search([('state', '=', 'queued')], order='id', limit=batch_size)
+            if not batch:
+                return
+            batch._process()
+            done += len(batch)
+            # Commit each batch so that its bus notifications go out now
+            self.env.cr.commit()
+        remaining = self.search_count([('state', '=', 'queued')])
+        if remaining:
+            self.env['ir.cron']._notify_progress(done=done, remaining=remaining)
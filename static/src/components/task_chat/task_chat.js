@@ -5,6 +5,11 @@ import { useService } from "@web/core/utils/hooks";
 import { registry } from "@web/core/registry";
 import { standardFieldProps } from "@web/views/fields/standard_field_props";
 import { rpc } from "@web/core/network/rpc";
+import { user } from "@web/core/user";
+import { expandCompactHistory, fetchCompactHistory } from "@project_ai_solver/core/compact_history";
+
+// Archived messages fetched per "load older" or search page
+const ARCHIVE_PAGE_SIZE = 100;
 
 export class TaskChatWidget extends Component {
     static template = "project_ai_solver.TaskChat";
@@ -21,6 +26,15 @@ export class TaskChatWidget extends Component {
             loading: true,
             pendingAttachments: [],
             uploading: false,
+            archivedCount: 0,
+            archivedMessages: [],
+            // Offset of the oldest loaded archived message, null until the first page
+            archivedOffset: null,
+            archiveSearch: "",
+            // Search results replace the message list while set
+            archiveResults: null,
+            archiveResultsHasMore: false,
+            suggestions: [],
         });
 
         this.messagesEnd = useRef("messagesEnd");
@@ -35,6 +49,11 @@ export class TaskChatWidget extends Component {
                     this._busDebounce = setTimeout(() => this.loadMessages(), 300);
                 }
             });
+            this.busService.subscribe("project_ai_solver/suggestion", (payload) => {
+                if (payload.channel_id === this.channelId) {
+                    this._addSuggestions([payload]);
+                }
+            });
         } catch (_e) {
             // bus_service not available (e.g. project sharing) — no real-time updates
         }
@@ -42,6 +61,9 @@ export class TaskChatWidget extends Component {
         onMounted(async () => {
             if (this.channelId) {
                 await this.loadMessages();
+                if (user.isInternalUser) {
+                    this.loadSuggestions();
+                }
             } else {
                 this.state.loading = false;
             }
@@ -58,6 +80,26 @@ export class TaskChatWidget extends Component {
         return 0;
     }
 
+    get allMessages() {
+        if (this.state.archiveResults) {
+            return this.state.archiveResults;
+        }
+        return [...this.state.archivedMessages, ...this.state.messages];
+    }
+
+    get archivedRemaining() {
+        const { archivedCount, archivedOffset } = this.state;
+        return archivedOffset === null ? archivedCount : archivedOffset;
+    }
+
+    _prepareMessages(messages) {
+        return (messages || []).map((m) => ({
+            ...m,
+            body: markup(m.body || ""),
+            attachments: m.attachments || [],
+        }));
+    }
+
     async loadMessages() {
         const channelId = this.channelId;
         if (!channelId) {
@@ -65,15 +107,14 @@ export class TaskChatWidget extends Component {
             return;
         }
         try {
-            const result = await rpc("/project_ai_solver/chat/history", {
-                channel_id: channelId,
-                limit: 100,
-            });
-            this.state.messages = (result.messages || []).map((m) => ({
-                ...m,
-                body: markup(m.body || ""),
-                attachments: m.attachments || [],
-            }));
+            const result = await fetchCompactHistory(channelId, 100);
+            if (result.error === "rate_limited") {
+                this.state.loading = false;
+                this._scheduleReload(result.retry_after);
+                return;
+            }
+            this.state.messages = this._prepareMessages(expandCompactHistory(result));
+            this.state.archivedCount = result.archived_count || 0;
         } catch (e) {
             this.notification.add("Failed to load chat messages", { type: "danger" });
         }
@@ -81,6 +122,93 @@ export class TaskChatWidget extends Component {
         this.scrollToBottom();
     }
 
+    _scheduleReload(retryAfter) {
+        clearTimeout(this._busDebounce);
+        this._busDebounce = setTimeout(() => this.loadMessages(), (retryAfter || 1) * 1000);
+    }
+
+    async _fetchArchive(params) {
+        const result = await rpc("/project_ai_solver/chat/archive", {
+            channel_id: this.channelId,
+            compact: true,
+            ...params,
+        });
+        return this._prepareMessages(expandCompactHistory(result));
+    }
+
+    async loadOlderArchivedMessages() {
+        // Archives are ordered oldest first: page backwards from the end
+        const end = this.archivedRemaining;
+        const offset = Math.max(0, end - ARCHIVE_PAGE_SIZE);
+        try {
+            const messages = await this._fetchArchive({ offset, limit: end - offset });
+            this.state.archivedMessages = [...messages, ...this.state.archivedMessages];
+            this.state.archivedOffset = offset;
+        } catch (e) {
+            this.notification.add("Failed to load archived messages", { type: "danger" });
+        }
+    }
+
+    async searchArchive(more = false) {
+        const search = this.state.archiveSearch.trim();
+        if (!search) {
+            this.clearArchiveSearch();
+            return;
+        }
+        const offset = more ? this.state.archiveResults.length : 0;
+        try {
+            const messages = await this._fetchArchive({ search, offset, limit: ARCHIVE_PAGE_SIZE });
+            this.state.archiveResults = more ? [...this.state.archiveResults, ...messages] : messages;
+            this.state.archiveResultsHasMore = messages.length === ARCHIVE_PAGE_SIZE;
+        } catch (e) {
+            this.notification.add("Failed to search archived messages", { type: "danger" });
+        }
+    }
+
+    clearArchiveSearch() {
+        this.state.archiveSearch = "";
+        this.state.archiveResults = null;
+        this.state.archiveResultsHasMore = false;
+    }
+
+    onArchiveSearchKeydown(ev) {
+        if (ev.key === "Enter") {
+            ev.preventDefault();
+            this.searchArchive();
+        } else if (ev.key === "Escape") {
+            this.clearArchiveSearch();
+        }
+    }
+
+    async loadSuggestions() {
+        try {
+            const result = await rpc("/project_ai_solver/chat/suggestions", {
+                channel_id: this.channelId,
+                limit: 3,
+            });
+            this._addSuggestions(result.suggestions || []);
+        } catch (_e) {
+            // Suggestions are optional — ignore failures
+        }
+    }
+
+    _addSuggestions(suggestions) {
+        const known = new Set(this.state.suggestions.map((s) => s.id));
+        const fresh = suggestions.filter((s) => !known.has(s.id));
+        this.state.suggestions = [...fresh, ...this.state.suggestions]
+            .sort((a, b) => b.id - a.id)
+            .slice(0, 3);
+    }
+
+    useSuggestion(suggestion) {
+        this.state.inputValue = suggestion.suggested_reply || "";
+        this.dismissSuggestion(suggestion);
+    }
+
+    dismissSuggestion(suggestion) {
+        this.state.suggestions = this.state.suggestions.filter((s) => s.id !== suggestion.id);
+    }
+
     async sendMessage() {
         const body = this.state.inputValue.trim();
         const attachmentIds = this.state.pendingAttachments.map((a) => a.id);
@@ -90,11 +218,18 @@ export class TaskChatWidget extends Component {
         if (!channelId) return;
 
         try {
-            await rpc("/project_ai_solver/chat/post", {
+            const result = await rpc("/project_ai_solver/chat/post", {
                 channel_id: channelId,
                 message_body: body || "",
                 attachment_ids: attachmentIds.length ? attachmentIds : null,
             });
+            if (result.error === "rate_limited") {
+                this.notification.add(
+                    `Sending too fast, please retry in ${result.retry_after}s.`,
+                    { type: "warning" }
+                );
+                return;
+            }
             this.state.inputValue = "";
             this.state.pendingAttachments = [];
             await this.loadMessages();
@@ -142,6 +277,11 @@ export class TaskChatWidget extends Component {
                             is_image: (result.mimetype || file.type || "").startsWith("image/"),
                         },
                     ];
+                } else if (result && result.error === "rate_limited") {
+                    this.notification.add(
+                        `Uploading too fast, please retry in ${result.retry_after}s.`,
+                        { type: "warning" }
+                    );
                 }
             } catch (e) {
                 this.notification.add(`Failed to upload "${file.name}"`, { type: "danger" });
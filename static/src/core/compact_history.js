@@ -0,0 +1,36 @@
+/** @odoo-module */
+
+/**
+ * Fetch the chat history of a channel in the compact wire format.
+ * Rate-limited requests resolve to `{ error: "rate_limited", retry_after }`.
+ */
+export async function fetchCompactHistory(channelId, limit) {
+    const params = new URLSearchParams({ channel_id: channelId });
+    if (limit) {
+        params.set("limit", limit);
+    }
+    const response = await fetch(`/project_ai_solver/chat/history/compact?${params}`, {
+        credentials: "same-origin",
+    });
+    const result = await response.json();
+    if (!response.ok && !result.error) {
+        throw new Error(`Chat history request failed (${response.status})`);
+    }
+    return result;
+}
+
+/**
+ * Expand a compact history payload into the message objects returned by
+ * the regular `/project_ai_solver/chat/history` route.
+ */
+export function expandCompactHistory(result) {
+    const authors = result.authors || {};
+    const attachments = result.attachments || {};
+    return (result.messages || []).map(([id, body, authorId, timestamp, attachmentIds]) => ({
+        id,
+        body,
+        author_id: authorId ? [authorId, authors[authorId]] : false,
+        date: timestamp ? new Date(timestamp * 1000).toLocaleString() : "",
+        attachments: attachmentIds.map((attId) => ({ id: attId, ...attachments[attId] })),
+    }));
+}
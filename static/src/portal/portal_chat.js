@@ -2,6 +2,10 @@
 
 import publicWidget from "@web/legacy/js/public/public_widget";
 import { rpc } from "@web/core/network/rpc";
+import { expandCompactHistory, fetchCompactHistory } from "@project_ai_solver/core/compact_history";
+
+// Archived messages fetched per "load older" or search page
+const ARCHIVE_PAGE_SIZE = 100;
 
 publicWidget.registry.PortalTaskChat = publicWidget.Widget.extend({
     selector: '#o_portal_task_chat',
@@ -11,6 +15,13 @@ publicWidget.registry.PortalTaskChat = publicWidget.Widget.extend({
         if (!this.channelId) return;
 
         this.messages = [];
+        this.archivedMessages = [];
+        this.archivedCount = 0;
+        // Offset of the oldest loaded archived message, null until the first page
+        this.archivedOffset = null;
+        // Search results replace the message list while set
+        this.archiveResults = null;
+        this.archiveResultsHasMore = false;
         this.pendingAttachments = [];
         this._renderChatUI();
         this._loadHistory();
@@ -20,6 +31,17 @@ publicWidget.registry.PortalTaskChat = publicWidget.Widget.extend({
     _renderChatUI() {
         this.el.innerHTML = `
             <div class="o_portal_chat d-flex flex-column" style="height: 400px;">
+                <div class="o_portal_chat_archive_search input-group input-group-sm p-2 border-bottom d-none">
+                    <span class="input-group-text"><i class="fa fa-archive"></i></span>
+                    <input type="search" class="form-control o_portal_chat_archive_input"
+                           placeholder="Search archived messages..."/>
+                    <button class="btn btn-outline-secondary o_portal_chat_archive_go" title="Search">
+                        <i class="fa fa-search"></i>
+                    </button>
+                    <button class="btn btn-outline-secondary o_portal_chat_archive_clear d-none" title="Clear search">
+                        <i class="fa fa-times"></i>
+                    </button>
+                </div>
                 <div class="o_portal_chat_messages flex-grow-1 overflow-auto p-3"
                      style="background: #f8f9fa;"></div>
                 <div class="o_portal_chat_pending_attachments px-3 d-flex flex-wrap gap-2"></div>
@@ -46,6 +68,9 @@ publicWidget.registry.PortalTaskChat = publicWidget.Widget.extend({
         this.sendBtn = this.el.querySelector('.o_portal_chat_send');
         this.attachBtn = this.el.querySelector('.o_portal_chat_attach');
         this.fileInput = this.el.querySelector('.o_portal_chat_file_input');
+        this.archiveSearchBar = this.el.querySelector('.o_portal_chat_archive_search');
+        this.archiveSearchInput = this.el.querySelector('.o_portal_chat_archive_input');
+        this.archiveClearBtn = this.el.querySelector('.o_portal_chat_archive_clear');
 
         this.sendBtn.addEventListener('click', () => this._sendMessage());
         this.input.addEventListener('keydown', (ev) => {
@@ -56,6 +81,16 @@ publicWidget.registry.PortalTaskChat = publicWidget.Widget.extend({
         });
         this.attachBtn.addEventListener('click', () => this.fileInput.click());
         this.fileInput.addEventListener('change', (ev) => this._onFilesSelected(ev));
+        this.el.querySelector('.o_portal_chat_archive_go').addEventListener('click', () => this._searchArchive());
+        this.archiveClearBtn.addEventListener('click', () => this._clearArchiveSearch());
+        this.archiveSearchInput.addEventListener('keydown', (ev) => {
+            if (ev.key === 'Enter') {
+                ev.preventDefault();
+                this._searchArchive();
+            } else if (ev.key === 'Escape') {
+                this._clearArchiveSearch();
+            }
+        });
     },
 
     async _onFilesSelected(ev) {
@@ -118,12 +153,19 @@ publicWidget.registry.PortalTaskChat = publicWidget.Widget.extend({
 
     async _loadHistory() {
         try {
-            const result = await rpc('/project_ai_solver/chat/history', {
-                channel_id: this.channelId,
-            });
+            const result = await fetchCompactHistory(this.channelId);
+            if (result && result.error === 'rate_limited') {
+                // Skip this round; the next poll retries
+                return;
+            }
             if (result && result.messages) {
-                this.messages = result.messages;
-                this._renderMessages();
+                this.messages = expandCompactHistory(result);
+                this.archivedCount = result.archived_count || 0;
+                this.archiveSearchBar.classList.toggle('d-none', !this.archivedCount);
+                // Only follow the conversation when something new arrived, so
+                // that polling does not scroll away from older messages
+                const lastMessage = this.messages[this.messages.length - 1];
+                this._renderMessages(Boolean(lastMessage) && lastMessage.id !== this._lastMessageId);
                 this._adjustPollingSpeed();
             }
         } catch (e) {
@@ -133,13 +175,88 @@ publicWidget.registry.PortalTaskChat = publicWidget.Widget.extend({
         }
     },
 
-    _renderMessages() {
-        if (!this.messages.length) {
-            this.messagesContainer.innerHTML =
-                '<div class="text-center text-muted p-3">No messages yet. Start the conversation!</div>';
+    async _fetchArchive(params) {
+        const result = await rpc('/project_ai_solver/chat/archive', {
+            channel_id: this.channelId,
+            compact: true,
+            ...params,
+        });
+        return result ? expandCompactHistory(result) : [];
+    },
+
+    _archivedRemaining() {
+        return this.archivedOffset === null ? this.archivedCount : this.archivedOffset;
+    },
+
+    async _loadOlderArchived() {
+        // Archives are ordered oldest first: page backwards from the end
+        const end = this._archivedRemaining();
+        const offset = Math.max(0, end - ARCHIVE_PAGE_SIZE);
+        try {
+            const messages = await this._fetchArchive({ offset, limit: end - offset });
+            this.archivedMessages = [...messages, ...this.archivedMessages];
+            this.archivedOffset = offset;
+            this._renderMessages(false);
+        } catch (e) {
+            console.error('Failed to load archived messages:', e);
+        }
+    },
+
+    async _searchArchive(more = false) {
+        const search = this.archiveSearchInput.value.trim();
+        if (!search) {
+            this._clearArchiveSearch();
+            return;
+        }
+        const offset = more ? this.archiveResults.length : 0;
+        try {
+            const messages = await this._fetchArchive({ search, offset, limit: ARCHIVE_PAGE_SIZE });
+            this.archiveResults = more ? [...this.archiveResults, ...messages] : messages;
+            this.archiveResultsHasMore = messages.length === ARCHIVE_PAGE_SIZE;
+            this.archiveClearBtn.classList.remove('d-none');
+            this._renderMessages(false);
+        } catch (e) {
+            console.error('Failed to search archived messages:', e);
+        }
+    },
+
+    _clearArchiveSearch() {
+        this.archiveSearchInput.value = '';
+        this.archiveResults = null;
+        this.archiveResultsHasMore = false;
+        this.archiveClearBtn.classList.add('d-none');
+        this._renderMessages(true);
+    },
+
+    _renderArchivedLink() {
+        const remaining = this._archivedRemaining();
+        if (this.archiveResults || !remaining) return '';
+        return `<div class="text-center mb-2">
+            <button class="btn btn-link btn-sm o_portal_chat_show_archived">
+                <i class="fa fa-archive me-1"></i>Load older archived messages (${remaining} remaining)
+            </button>
+        </div>`;
+    },
+
+    _renderMoreResultsLink() {
+        if (!this.archiveResults || !this.archiveResultsHasMore) return '';
+        return `<div class="text-center">
+            <button class="btn btn-link btn-sm o_portal_chat_more_results">More results</button>
+        </div>`;
+    },
+
+    _renderMessages(scroll = true) {
+        const messages = this.archiveResults || [...this.archivedMessages, ...this.messages];
+        if (!messages.length) {
+            const empty = this.archiveResults
+                ? 'No archived message matches this search.'
+                : 'No messages yet. Start the conversation!';
+            this.messagesContainer.innerHTML = this._renderArchivedLink() +
+                `<div class="text-center text-muted p-3">${empty}</div>`;
+            this._bindArchivedLink();
             return;
         }
-        this.messagesContainer.innerHTML = this.messages.map((msg) => {
+        this.messagesContainer.innerHTML = this._renderArchivedLink() + messages.map((msg) => {
             let attachmentsHtml = '';
             if (msg.attachments && msg.attachments.length) {
                 attachmentsHtml = '<div class="o_chat_attachments mt-2 d-flex flex-wrap gap-2">' +
@@ -174,8 +291,22 @@ publicWidget.registry.PortalTaskChat = publicWidget.Widget.extend({
                     ${attachmentsHtml}
                 </div>
             `;
-        }).join('');
-        this._scrollToBottom();
+        }).join('') + this._renderMoreResultsLink();
+        this._bindArchivedLink();
+        if (scroll) {
+            this._scrollToBottom();
+        }
+    },
+
+    _bindArchivedLink() {
+        const link = this.messagesContainer.querySelector('.o_portal_chat_show_archived');
+        if (link) {
+            link.addEventListener('click', () => this._loadOlderArchived());
+        }
+        const more = this.messagesContainer.querySelector('.o_portal_chat_more_results');
+        if (more) {
+            more.addEventListener('click', () => this._searchArchive(true));
+        }
     },
 
     async _sendMessage() {
@@ -185,11 +316,15 @@ publicWidget.registry.PortalTaskChat = publicWidget.Widget.extend({
         if (!body && !attachmentIds.length) return;
 
         try {
-            await rpc('/project_ai_solver/chat/post', {
+            const result = await rpc('/project_ai_solver/chat/post', {
                 channel_id: this.channelId,
                 message_body: body || '',
                 attachment_ids: attachmentIds.length ? attachmentIds : null,
             });
+            if (result && result.error === 'rate_limited') {
+                alert(`Sending too fast, please retry in ${result.retry_after}s.`);
+                return;
+            }
             this.input.value = '';
             this.pendingAttachments = [];
             this._renderPendingAttachments();
@@ -202,7 +337,7 @@ publicWidget.registry.PortalTaskChat = publicWidget.Widget.extend({
     _startSmartPolling() {
         // Fast poll (3s) initially, slow down to 15s after 2 minutes of no new messages
         this._pollIntervalMs = 3000;
-        this._lastMessageCount = 0;
+        this._lastMessageId = 0;
         this._noChangeCount = 0;
 
         this._pollTimer = setInterval(() => {
@@ -211,10 +346,13 @@ publicWidget.registry.PortalTaskChat = publicWidget.Widget.extend({
     },
 
     _adjustPollingSpeed() {
-        const currentCount = this.messages.length;
-        if (currentCount !== this._lastMessageCount) {
+        // History is a fixed-size window of the latest messages, so its
+        // length stops changing once the chat is long enough: compare ids
+        const lastMessage = this.messages[this.messages.length - 1];
+        const lastMessageId = lastMessage ? lastMessage.id : 0;
+        if (lastMessageId !== this._lastMessageId) {
             // New messages arrived — keep fast polling, reset counter
-            this._lastMessageCount = currentCount;
+            this._lastMessageId = lastMessageId;
             this._noChangeCount = 0;
             if (this._pollIntervalMs !== 3000) {
                 this._pollIntervalMs = 3000;
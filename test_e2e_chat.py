@@ -403,6 +403,51 @@ try:
 except Exception as e:
     log(False, f"Bus notification test failed: {e}")
 
+# ============================================================
+# TEST 15: Concurrent first-open auto-join
+# ============================================================
+print("\n=== TEST 15: Concurrent Auto-Join ===")
+try:
+    if channel_id:
+        from concurrent.futures import ThreadPoolExecutor
+        import threading
+
+        portal_users = xmlrpc_call("res.users", "search_read",
+                                   [[["login", "=", PORTAL_LOGIN]]], {"fields": ["partner_id"]})
+        portal_partner_id = portal_users[0]["partner_id"][0]
+
+        # Make sure the portal user may access the task but is not a member yet
+        xmlrpc_call("project.task", "message_subscribe", [[task_id]], {"partner_ids": [portal_partner_id]})
+        member_ids = xmlrpc_call("discuss.channel.member", "search",
+                                 [[["channel_id", "=", channel_id], ["partner_id", "=", portal_partner_id]]])
+        if member_ids:
+            xmlrpc_call("discuss.channel.member", "unlink", [member_ids])
+
+        parallel = 8
+        sessions = [make_session(PORTAL_LOGIN, PORTAL_PASS)[0] for _i in range(parallel)]
+        barrier = threading.Barrier(parallel)
+
+        # History reads are read-only and never join; the first post does
+        def first_post(session):
+            barrier.wait()
+            return json_rpc(session, "/project_ai_solver/chat/post", {
+                "channel_id": channel_id,
+                "message_body": "Concurrent first message",
+            })
+
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            results = list(executor.map(first_post, sessions))
+
+        log(all(r.get("success") is True for r in results),
+            f"All {parallel} concurrent first-post requests succeeded")
+        members = xmlrpc_call("discuss.channel.member", "search_count",
+                              [[["channel_id", "=", channel_id], ["partner_id", "=", portal_partner_id]]])
+        log(members == 1, f"Portal user joined exactly once ({members} membership(s))")
+    else:
+        log(False, "No channel for concurrency test")
+except Exception as e:
+    log(False, f"Concurrent auto-join test failed: {e}")
+
 # ============================================================
 # SUMMARY
 # ============================================================
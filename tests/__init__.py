@@ -1 +1,8 @@
 from . import test_task_channel
+from . import test_chat_metrics
+from . import test_chat_archive
+from . import test_rate_limit
+from . import test_chat_snapshot
+from . import test_chat_export
+from . import test_compact_history
+from . import test_chat_suggestion
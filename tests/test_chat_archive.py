@@ -0,0 +1,106 @@
+from datetime import timedelta
+
+from odoo import fields
+from odoo.exceptions import AccessError
+from odoo.tests.common import TransactionCase
+
+
+class TestTaskChatArchive(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.internal_user = cls.env['res.users'].create({
+            'name': 'Archive Agent',
+            'login': 'archive_agent_test',
+            'groups_id': [(6, 0, [cls.env.ref('base.group_user').id])],
+        })
+        cls.project = cls.env['project.project'].create({
+            'name': 'Archive Project',
+            'chat_archive_enabled': True,
+            'chat_retention_days': 30,
+        })
+        cls.task = cls.env['project.task'].create({
+            'name': 'Archive Task',
+            'project_id': cls.project.id,
+            'user_ids': [(6, 0, [cls.internal_user.id])],
+        })
+        cls.task.write({'chat_enabled': True})
+        cls.channel = cls.task.channel_id
+        for body in ('First question', 'Second answer'):
+            cls.channel.message_post(body=body, message_type='comment', subtype_xmlid='mail.mt_comment')
+
+    def _channel_messages(self):
+        return self.env['mail.message'].search([
+            ('model', '=', 'discuss.channel'),
+            ('res_id', '=', self.channel.id),
+            ('message_type', '=', 'comment'),
+        ])
+
+    def _close_task(self, days_ago):
+        self.task.write({'state': '1_done'})
+        self.task.date_closed = fields.Datetime.now() - timedelta(days=days_ago)
+
+    def test_cron_respects_retention(self):
+        """Chats of recently closed tasks should not be archived."""
+        self._close_task(days_ago=5)
+        self.env['project.task.chat.archive']._cron_archive_task_chats()
+        self.assertEqual(len(self._channel_messages()), 2)
+
+    def test_retention_counts_from_close(self):
+        """A task closed today is kept, however long it sat in its stage."""
+        self.task.date_last_stage_update = fields.Datetime.now() - timedelta(days=90)
+        self.task.write({'state': '1_done'})
+        self.assertTrue(self.task.date_closed)
+        self.env['project.task.chat.archive']._cron_archive_task_chats()
+        self.assertEqual(len(self._channel_messages()), 2)
+
+        self.task.write({'state': '01_in_progress'})
+        self.assertFalse(self.task.date_closed)
+
+    def test_archive_and_search(self):
+        """Old closed task chats are moved into a searchable archive."""
+        self._close_task(days_ago=60)
+        self.env['project.task.chat.archive']._cron_archive_task_chats()
+
+        self.assertFalse(self._channel_messages())
+        archive = self.env['project.task.chat.archive'].search([('channel_id', '=', self.channel.id)])
+        self.assertEqual(archive.message_count, 2)
+        found = archive._search_transcript('second')
+        self.assertEqual(len(found), 1)
+        self.assertIn('Second answer', found[0]['body'])
+
+    def test_restore_on_reopen(self):
+        """Reopening the task flags the archive, which restores the messages."""
+        self._close_task(days_ago=60)
+        Archive = self.env['project.task.chat.archive']
+        Archive._cron_archive_task_chats()
+
+        self.task.write({'state': '01_in_progress'})
+        archive = Archive.search([('channel_id', '=', self.channel.id)])
+        self.assertTrue(archive.restore_pending)
+
+        Archive._cron_archive_task_chats()
+        self.assertFalse(archive.exists())
+        self.assertEqual(len(self._channel_messages()), 2)
+
+    def test_archive_not_readable_by_rpc(self):
+        """Internal users only reach archives through the access-checked chat routes."""
+        self._close_task(days_ago=60)
+        self.env['project.task.chat.archive']._cron_archive_task_chats()
+        with self.assertRaises(AccessError):
+            self.env['project.task.chat.archive'].with_user(self.internal_user).search_read([], ['transcript'])
+
+    def test_transcript_read_incrementally(self):
+        """Transcripts are parsed chunk by chunk, across message boundaries."""
+        archive = self.env['project.task.chat.archive'].create({
+            'task_id': self.task.id,
+            'channel_id': self.channel.id,
+        })
+        messages = [
+            {'id': i, 'body': '<p>Message [%d], "quoted" — é</p>' % i, 'author_id': False, 'date': '2024-01-01 00:00:00'}
+            for i in range(50)
+        ]
+        archive._write_transcript(messages)
+        self.assertEqual(list(archive._iter_transcript(chunk_size=7)), messages)
+        self.assertEqual(archive._search_transcript('[4', offset=1, limit=2), messages[40:42])
@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase
+
+from ..tools import chat_export
+from ..tools.chat_export import CsvWriter, HtmlWriter, JsonLinesWriter, _export_row, iter_task_messages
+
+
+class TestTaskChatExport(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.internal_user = cls.env['res.users'].create({
+            'name': 'Export Agent',
+            'login': 'export_agent_test',
+            'groups_id': [(6, 0, [cls.env.ref('base.group_user').id])],
+        })
+        cls.task = cls.env['project.task'].create({
+            'name': 'Export Task',
+            'project_id': cls.env['project.project'].create({'name': 'Export'}).id,
+            'user_ids': [(6, 0, [cls.internal_user.id])],
+        })
+        cls.task.write({'chat_enabled': True})
+        for idx in range(5):
+            cls.task.channel_id.message_post(
+                body='line %s' % idx, message_type='comment', subtype_xmlid='mail.mt_comment',
+            )
+
+    def test_keyset_batches(self):
+        """All messages are exported in order, whatever the batch size."""
+        with patch.object(chat_export, 'EXPORT_BATCH_SIZE', 2):
+            messages = list(iter_task_messages(self.env, self.task))
+        self.assertEqual(len(messages), 5)
+        ids = [msg['id'] for msg in messages]
+        self.assertEqual(ids, sorted(ids))
+
+    def test_archive_pending_restore_exported(self):
+        """Archived messages are exported until they are actually restored."""
+        archived = self.env['project.task.chat.archive']._archive_channel(self.task)
+        self.assertEqual(archived, 5)
+        self.env['project.task.chat.archive'].search([
+            ('channel_id', '=', self.task.channel_id.id),
+        ]).restore_pending = True
+
+        messages = list(iter_task_messages(self.env, self.task))
+        self.assertEqual(len(messages), 5)
+        self.assertTrue(all(msg['archived'] for msg in messages))
+
+    def test_writers(self):
+        rows = [_export_row(self.task, msg) for msg in iter_task_messages(self.env, self.task)]
+
+        jsonl = ''.join(JsonLinesWriter().row(row) for row in rows)
+        self.assertEqual(len(jsonl.splitlines()), 5)
+        self.assertEqual(json.loads(jsonl.splitlines()[0])['task_id'], self.task.id)
+
+        writer = CsvWriter()
+        content = writer.header() + ''.join(writer.row(row) for row in rows)
+        lines = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(lines[0][0], 'task_id')
+        self.assertEqual(len(lines), 6)
+
+        writer = HtmlWriter()
+        html = writer.header() + ''.join(writer.row(row) for row in rows) + writer.footer()
+        self.assertEqual(html.count('<h2>'), 1)
+        self.assertIn('Export Task', html)
+        self.assertTrue(html.endswith('</body></html>\n'))
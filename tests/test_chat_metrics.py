@@ -0,0 +1,70 @@
+import os
+import tempfile
+
+from odoo.tests.common import TransactionCase
+
+from ..tools.chat_metrics import METRICS, ChatMetrics, RouteTimer
+
+
+class TestChatMetrics(TransactionCase):
+
+    def test_route_timer_stages(self):
+        """Stages should be recorded in order and rendered as Server-Timing."""
+        metrics = ChatMetrics()
+        timer = RouteTimer('chat.history', self.env.cr)
+        with timer.stage('access'):
+            self.env.cr.execute("SELECT 1")
+        with timer.stage('search'):
+            pass
+        timer.duration = 0.01
+        metrics.observe(timer)
+
+        self.assertEqual([name for name, _dur, _sql in timer.stages], ['access', 'search'])
+        header = timer.server_timing()
+        self.assertIn('access;dur=', header)
+        self.assertIn('total;dur=', header)
+
+        output = metrics.render_prometheus()
+        self.assertIn('project_ai_solver_requests_total{route="chat.history",status="ok"} 1', output)
+        self.assertIn('project_ai_solver_request_duration_seconds_bucket{route="chat.history",le="0.01"} 1', output)
+        self.assertIn('project_ai_solver_request_duration_seconds_bucket{route="chat.history",le="0.005"} 0', output)
+        self.assertIn('project_ai_solver_stage_calls_total{route="chat.history",stage="access"} 1', output)
+
+    def test_message_post_recorded(self):
+        """Posting on a task chat channel should be counted with a notify stage."""
+        user = self.env['res.users'].create({
+            'name': 'Metrics Agent',
+            'login': 'metrics_agent_test',
+            'groups_id': [(6, 0, [self.env.ref('base.group_user').id])],
+        })
+        task = self.env['project.task'].create({
+            'name': 'Metrics Task',
+            'project_id': self.env['project.project'].create({'name': 'Metrics'}).id,
+            'user_ids': [(6, 0, [user.id])],
+        })
+        task.write({'chat_enabled': True})
+
+        METRICS.reset()
+        task.channel_id.message_post(body='ping', message_type='comment')
+        output = METRICS.render_prometheus()
+        self.assertIn('route="discuss.channel.message_post",status="ok"', output)
+        self.assertIn('route="discuss.channel.message_post",stage="notify"', output)
+
+    def test_metrics_merged_across_processes(self):
+        """Totals written by other workers, live or exited, should be reported."""
+        with tempfile.TemporaryDirectory() as directory:
+            metrics = ChatMetrics(directory)
+            timer = RouteTimer('chat.post')
+            metrics.observe(timer)
+
+            other = ChatMetrics(directory)
+            other.observe(timer)
+            other.observe(timer)
+            other.flush()
+            # A file left by a worker that has exited
+            os.rename(other._path, os.path.join(directory, '999999999-dead.json'))
+
+            line = 'project_ai_solver_requests_total{route="chat.post",status="ok"} 3'
+            self.assertIn(line, metrics.render_prometheus())
+            self.assertNotIn('999999999-dead.json', os.listdir(directory))
+            self.assertIn(line, metrics.render_prometheus(), "Retired totals should be kept")
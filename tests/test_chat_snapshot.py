@@ -0,0 +1,95 @@
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase
+
+
+class TestTaskChatSnapshot(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.internal_user = cls.env['res.users'].create({
+            'name': 'Snapshot Agent',
+            'login': 'snapshot_agent_test',
+            'groups_id': [(6, 0, [cls.env.ref('base.group_user').id])],
+        })
+        cls.task = cls.env['project.task'].create({
+            'name': 'Snapshot Task',
+            'project_id': cls.env['project.project'].create({'name': 'Snapshot'}).id,
+            'user_ids': [(6, 0, [cls.internal_user.id])],
+        })
+        cls.task.write({'chat_enabled': True})
+        cls.channel = cls.task.channel_id
+
+    def _post(self, body):
+        return self.channel.message_post(body=body, message_type='comment', subtype_xmlid='mail.mt_comment')
+
+    def test_snapshot_built_and_appended(self):
+        """Posting builds the snapshot, later posts are appended to it."""
+        self._post('one')
+        self.assertEqual(len(self.channel.task_chat_snapshot), 1)
+        history = self.channel._task_chat_read_history(50)
+        self.assertEqual(len(history), 1)
+
+        self._post('two')
+        snapshot = self.channel.task_chat_snapshot
+        self.assertEqual(len(snapshot), 2)
+        self.assertIn('two', snapshot[-1]['body'])
+        self.assertEqual(snapshot[-1]['attachments'], [])
+
+    def test_history_returns_latest_window(self):
+        for idx in range(5):
+            self._post('message %s' % idx)
+        history = self.channel._task_chat_read_history(2)
+        self.assertEqual(len(history), 2)
+        self.assertIn('message 3', history[0]['body'])
+        self.assertIn('message 4', history[1]['body'])
+
+    def test_snapshot_invalidated_on_delete(self):
+        self._post('kept')
+        message = self._post('to delete')
+        self.assertTrue(self.channel.task_chat_snapshot)
+        message.unlink()
+        self.assertFalse(self.channel.task_chat_snapshot)
+
+        # Reads fall back to a search and do not rebuild the snapshot
+        history = self.channel._task_chat_read_history(50)
+        self.assertEqual(len(history), 1)
+        self.assertFalse(self.channel.task_chat_snapshot)
+
+    def test_post_issues_attachment_tokens(self):
+        """Attachments get their access token when posted, not when read,
+        without forcing a snapshot rebuild."""
+        self._post('before')
+        attachment = self.env['ir.attachment'].create({
+            'name': 'report.txt',
+            'raw': b'report',
+            'res_model': 'mail.compose.message',
+            'res_id': 0,
+        })
+        self.assertFalse(attachment.access_token)
+        with patch.object(
+            type(self.channel), '_task_chat_snapshot_rebuild', autospec=True,
+        ) as rebuild:
+            self.channel.message_post(
+                body='see attached', message_type='comment', attachment_ids=attachment.ids,
+            )
+        rebuild.assert_not_called()
+        self.assertTrue(attachment.access_token)
+        history = self.channel._task_chat_read_history(50)
+        self.assertEqual(len(history), 2)
+        self.assertEqual(history[-1]['attachments'][0]['access_token'], attachment.access_token)
+
+    def test_post_ignores_foreign_attachments(self):
+        """Attachments the post does not link are left untouched."""
+        foreign = self.env['ir.attachment'].create({
+            'name': 'invoice.pdf',
+            'raw': b'private',
+            'res_model': 'res.partner',
+            'res_id': self.internal_user.partner_id.id,
+        })
+        self.channel.message_post(
+            body='not mine', message_type='comment', attachment_ids=foreign.ids,
+        )
+        self.assertFalse(foreign.access_token)
+        self.assertEqual(foreign.res_model, 'res.partner')
@@ -0,0 +1,90 @@
+from unittest.mock import patch
+
+from odoo.exceptions import AccessError
+from odoo.tests.common import TransactionCase
+
+
+class TestTaskChatSuggestion(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.internal_user = cls.env['res.users'].create({
+            'name': 'Suggestion Agent',
+            'login': 'suggestion_agent_test',
+            'groups_id': [(6, 0, [cls.env.ref('base.group_user').id])],
+        })
+        cls.portal_user = cls.env['res.users'].create({
+            'name': 'Suggestion Customer',
+            'login': 'suggestion_customer_test',
+            'groups_id': [(6, 0, [cls.env.ref('base.group_portal').id])],
+        })
+        cls.task = cls.env['project.task'].create({
+            'name': 'Suggestion Task',
+            'project_id': cls.env['project.project'].create({'name': 'Suggestions'}).id,
+            'user_ids': [(6, 0, [cls.internal_user.id])],
+            'partner_id': cls.portal_user.partner_id.id,
+        })
+        cls.task.write({'chat_enabled': True})
+        cls.channel = cls.task.channel_id
+        cls.Suggestion = cls.env['project.task.chat.suggestion']
+        cls.env['ir.config_parameter'].sudo().set_param('project_ai_solver.suggestion_backend', 'stub')
+
+    def _post(self, user, body):
+        return self.channel.with_user(user).message_post(
+            body=body, message_type='comment', subtype_xmlid='mail.mt_comment',
+        )
+
+    def test_customer_message_queued(self):
+        """Only customer messages are queued, and nothing is computed inline."""
+        customer_message = self._post(self.portal_user, 'My invoice is wrong')
+        self._post(self.internal_user, 'Looking into it')
+
+        suggestions = self.Suggestion.search([('channel_id', '=', self.channel.id)])
+        self.assertEqual(suggestions.message_id, customer_message)
+        self.assertEqual(suggestions.state, 'queued')
+        self.assertFalse(suggestions.suggested_reply)
+
+    def test_batch_processing_with_stub(self):
+        self._post(self.portal_user, 'My invoice is wrong')
+        self._post(self.portal_user, 'The app shows an error when saving')
+        suggestions = self.Suggestion.search([('channel_id', '=', self.channel.id)], order='id')
+
+        suggestions._process()
+        self.assertEqual(suggestions.mapped('state'), ['done', 'done'])
+        self.assertEqual(suggestions.mapped('category'), ['billing', 'bug'])
+        self.assertTrue(all(suggestions.mapped('suggested_reply')))
+        self.assertEqual(set(suggestions.mapped('backend')), {'stub'})
+
+    def test_missing_results_fail(self):
+        """Messages the backend returns no result for are not left queued."""
+        self._post(self.portal_user, 'My invoice is wrong')
+        self._post(self.portal_user, 'The app shows an error when saving')
+        suggestions = self.Suggestion.search([('channel_id', '=', self.channel.id)], order='id')
+
+        stub = type(self.Suggestion)._suggest_batch_stub
+        with patch.object(
+            type(self.Suggestion), '_suggest_batch_stub',
+            lambda self, texts: stub(self, texts)[:1],
+        ):
+            suggestions._process()
+        self.assertEqual(suggestions.mapped('state'), ['done', 'failed'])
+        self.assertTrue(suggestions[1].error)
+
+    def test_disabled_backend(self):
+        self.env['ir.config_parameter'].sudo().set_param('project_ai_solver.suggestion_backend', '')
+        self._post(self.portal_user, 'Hello?')
+        self.assertFalse(self.Suggestion.search([('channel_id', '=', self.channel.id)]))
+
+    def test_unknown_backend(self):
+        self._post(self.portal_user, 'Hello?')
+        suggestion = self.Suggestion.search([('channel_id', '=', self.channel.id)])
+        self.env['ir.config_parameter'].sudo().set_param('project_ai_solver.suggestion_backend', 'missing')
+        suggestion._process()
+        self.assertEqual(suggestion.state, 'failed')
+
+    def test_not_readable_by_rpc(self):
+        """Internal users only get suggestions through the chat route."""
+        self._post(self.portal_user, 'Hello?')
+        with self.assertRaises(AccessError):
+            self.Suggestion.with_user(self.internal_user).search_read([], ['suggested_reply'])
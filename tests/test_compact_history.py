@@ -0,0 +1,36 @@
+from odoo.tests.common import BaseCase
+
+from ..tools.compact_history import compact_history
+
+
+class TestCompactHistory(BaseCase):
+
+    def test_compact_history(self):
+        """Authors and attachments are deduplicated, dates become integers."""
+        attachment = {
+            'id': 7, 'name': 'a.png', 'mimetype': 'image/png',
+            'file_size': 10, 'access_token': 'tok', 'is_image': True,
+        }
+        payload = {
+            'archived_count': 3,
+            'messages': [
+                {'id': 1, 'body': '<p>hi</p>', 'author_id': [5, 'Alice'],
+                 'date': '2025-01-01 00:00:00', 'attachments': [attachment]},
+                {'id': 2, 'body': '<p>again</p>', 'author_id': [5, 'Alice'],
+                 'date': '2025-01-01 00:01:00', 'attachments': [attachment]},
+                {'id': 3, 'body': False, 'author_id': False,
+                 'date': '2025-01-01 00:02:00', 'attachments': []},
+            ],
+        }
+        compact = compact_history(payload)
+
+        self.assertEqual(compact['format'], 'compact')
+        self.assertEqual(compact['archived_count'], 3)
+        self.assertEqual(compact['authors'], {5: 'Alice'})
+        self.assertEqual(list(compact['attachments']), [7])
+        self.assertNotIn('id', compact['attachments'][7])
+        self.assertEqual(compact['messages'], [
+            [1, '<p>hi</p>', 5, 1735689600, [7]],
+            [2, '<p>again</p>', 5, 1735689660, [7]],
+            [3, '', 0, 1735689720, []],
+        ])
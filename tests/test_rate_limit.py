@@ -0,0 +1,61 @@
+import threading
+import time
+
+from odoo.tests.common import BaseCase
+
+from ..tools.rate_limit import RateLimiter, RequestCoalescer, TokenBucket
+
+
+class TestRateLimit(BaseCase):
+
+    def test_token_bucket_burst(self):
+        """A bucket allows ``burst`` requests, then asks to wait for a token."""
+        bucket = TokenBucket(rate=2.0, burst=3)
+        now = bucket.updated
+        self.assertEqual([bucket.consume(now) for _i in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(bucket.consume(now), 0.5)
+        # Half a second later a token is available again
+        self.assertEqual(bucket.consume(now + 0.5), 0)
+
+    def test_limiter_keys_are_independent(self):
+        limiter = RateLimiter()
+        self.assertEqual(limiter.hit(('user', 1), 1.0, 1), 0)
+        self.assertGreater(limiter.hit(('user', 1), 1.0, 1), 0)
+        self.assertEqual(limiter.hit(('user', 2), 1.0, 1), 0)
+
+    def test_limiter_refund(self):
+        """A refunded token can be used again, up to the burst size."""
+        limiter = RateLimiter()
+        self.assertEqual(limiter.hit(('user', 1), 0.001, 1), 0)
+        limiter.refund(('user', 1))
+        limiter.refund(('user', 1))
+        self.assertEqual(limiter.hit(('user', 1), 0.001, 1), 0)
+        self.assertGreater(limiter.hit(('user', 1), 0.001, 1), 0)
+
+    def test_coalescer_shares_result(self):
+        """Concurrent calls with the same key run the computation once."""
+        coalescer = RequestCoalescer()
+        calls = []
+        started = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return {'messages': [1, 2]}
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(coalescer.run('k', compute)))
+        leader.start()
+        started.wait()
+        followers = [
+            threading.Thread(target=lambda: results.append(coalescer.run('k', compute)))
+            for _i in range(3)
+        ]
+        for thread in followers:
+            thread.start()
+        for thread in [leader, *followers]:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'messages': [1, 2]}] * 4)
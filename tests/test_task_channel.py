@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 from odoo.tests.common import TransactionCase
 from odoo.exceptions import AccessError
 
@@ -116,3 +118,61 @@ class TestTaskChatChannel(TransactionCase):
             ('body', 'like', 'Hello from portal'),
         ])
         self.assertTrue(messages)
+
+    def test_insert_members_idempotent(self):
+        """Adding an existing member again should be a no-op, not an error."""
+        self.task.write({'chat_enabled': True})
+        channel = self.task.channel_id
+        partner = self.other_portal_user.partner_id
+        Channel = self.env['discuss.channel']
+
+        added = Channel._task_chat_insert_members([(channel.id, partner.id)])
+        self.assertEqual(added, [(channel.id, partner.id)])
+        self.assertTrue(channel._task_chat_is_member(partner))
+
+        # A second (e.g. concurrent) join does not raise nor duplicate
+        self.assertEqual(Channel._task_chat_insert_members([(channel.id, partner.id)]), [])
+        members = channel.channel_member_ids.filtered(lambda m: m.partner_id == partner)
+        self.assertEqual(len(members), 1)
+
+    def test_insert_members_concurrent_join(self):
+        """A member added by another transaction is skipped without breaking
+        the current one."""
+        self.task.write({'chat_enabled': True})
+        channel = self.task.channel_id
+        partner = self.other_portal_user.partner_id
+        Channel = self.env['discuss.channel']
+        newcomer = self.env['res.partner'].create({'name': 'Newcomer'})
+        Channel._task_chat_insert_members([(channel.id, partner.id)])
+
+        # The other transaction's member is not visible in our snapshot
+        with patch.object(type(Channel), '_task_chat_member_pairs', return_value=set()):
+            added = Channel._task_chat_insert_members([
+                (channel.id, partner.id),
+                (channel.id, newcomer.id),
+            ])
+        self.assertEqual(added, [(channel.id, newcomer.id)])
+        self.assertTrue(channel._task_chat_is_member(newcomer))
+        # The transaction is still usable
+        self.assertTrue(channel._task_chat_is_member(partner))
+
+    def test_member_sync_on_customer_change(self):
+        """Changing the task customer swaps the external channel member."""
+        self.task.write({'chat_enabled': True})
+        channel = self.task.channel_id
+        self.task.message_unsubscribe(partner_ids=self.portal_user.partner_id.ids)
+        self.task.write({'partner_id': self.other_portal_user.partner_id.id})
+
+        member_partners = channel.channel_member_ids.mapped('partner_id')
+        self.assertIn(self.other_portal_user.partner_id, member_partners)
+        self.assertNotIn(self.portal_user.partner_id, member_partners)
+        # Internal assignees are kept
+        self.assertIn(self.internal_user.partner_id, member_partners)
+
+    def test_member_sync_on_follow(self):
+        """New task followers become channel members right away."""
+        self.task.write({'chat_enabled': True})
+        partner = self.other_portal_user.partner_id
+        self.assertFalse(self.task.channel_id._task_chat_is_member(partner))
+        self.task.message_subscribe(partner_ids=partner.ids)
+        self.assertTrue(self.task.channel_id._task_chat_is_member(partner))
@@ -0,0 +1,4 @@
+from . import chat_export
+from . import chat_metrics
+from . import compact_history
+from . import rate_limit
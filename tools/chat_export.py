@@ -0,0 +1,220 @@
+import csv
+import io
+import json
+import zipfile
+
+from markupsafe import escape
+
+from odoo import api
+from odoo.tools import html2plaintext, split_every
+
+# Messages fetched per keyset batch
+EXPORT_BATCH_SIZE = 500
+
+EXPORT_COLUMNS = ['task_id', 'task', 'message_id', 'date', 'author', 'body', 'attachments']
+
+
+def _export_row(task, msg):
+    return {
+        'task_id': task.id,
+        'task': task.name,
+        'message_id': msg['id'],
+        'date': msg['date'],
+        'author': msg['author_id'][1] if msg['author_id'] else '',
+        'body': msg['body'] or '',
+        'attachments': [
+            {'id': att['id'], 'name': att['name'], 'mimetype': att['mimetype'], 'file_size': att['file_size']}
+            for att in msg['attachments']
+        ],
+        'archived': msg.get('archived', False),
+    }
+
+
+class JsonLinesWriter:
+    extension = 'jsonl'
+    mimetype = 'application/x-ndjson'
+
+    def header(self):
+        return ''
+
+    def row(self, row):
+        return json.dumps(row, ensure_ascii=False) + '\n'
+
+    def footer(self):
+        return ''
+
+
+class CsvWriter:
+    extension = 'csv'
+    mimetype = 'text/csv'
+
+    def _line(self, values):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(values)
+        return buffer.getvalue()
+
+    def header(self):
+        return self._line(EXPORT_COLUMNS)
+
+    def row(self, row):
+        return self._line([
+            row['task_id'],
+            row['task'],
+            row['message_id'],
+            row['date'],
+            row['author'],
+            html2plaintext(row['body']),
+            '; '.join(att['name'] for att in row['attachments']),
+        ])
+
+    def footer(self):
+        return ''
+
+
+class HtmlWriter:
+    extension = 'html'
+    mimetype = 'text/html'
+
+    def __init__(self):
+        self._task_id = None
+
+    def header(self):
+        return (
+            '<!DOCTYPE html>\n<html><head><meta charset="utf-8"/>'
+            '<title>Task Chat Transcript</title></head><body>\n'
+        )
+
+    def row(self, row):
+        html = ''
+        if row['task_id'] != self._task_id:
+            if self._task_id is not None:
+                html += '</table>\n'
+            self._task_id = row['task_id']
+            html += (
+                '<h2>%s</h2>\n<table border="1" cellpadding="4">\n'
+                '<tr><th>Date</th><th>Author</th><th>Message</th><th>Attachments</th></tr>\n'
+            ) % escape(row['task'])
+        # Message bodies are stored sanitized
+        html += '<tr><td>%s</td><td>%s</td><td>%s</td><td>%s</td></tr>\n' % (
+            escape(row['date']),
+            escape(row['author']),
+            row['body'],
+            '<br/>'.join(str(escape(att['name'])) for att in row['attachments']),
+        )
+        return html
+
+    def footer(self):
+        return ('</table>\n' if self._task_id is not None else '') + '</body></html>\n'
+
+
+EXPORT_WRITERS = {
+    'jsonl': JsonLinesWriter,
+    'csv': CsvWriter,
+    'html': HtmlWriter,
+}
+
+
+def iter_task_messages(env, task):
+    """Yield the serialized chat messages of ``task``, oldest first.
+
+    Archived messages come first, read from the transcript in slices,
+    then live messages fetched in keyset batches, so that memory does not
+    grow with the size of the chat.
+    """
+    channel = task.channel_id.sudo()
+    archive = env['project.task.chat.archive'].sudo().search([('channel_id', '=', channel.id)], limit=1)
+    # A pending restore has not moved the messages back yet: they are
+    # still only in the archive
+    if archive:
+        for archived in split_every(EXPORT_BATCH_SIZE, archive._iter_transcript(), list):
+            for msg in channel._task_chat_format_messages(archived):
+                msg['archived'] = True
+                yield msg
+            env.invalidate_all()
+
+    last_id = 0
+    while True:
+        messages = env['mail.message'].sudo().search_read(
+            [
+                ('model', '=', 'discuss.channel'),
+                ('res_id', '=', channel.id),
+                ('message_type', 'in', ['comment', 'notification']),
+                ('id', '>', last_id),
+            ],
+            fields=['body', 'author_id', 'date', 'attachment_ids'],
+            order='id asc',
+            limit=EXPORT_BATCH_SIZE,
+        )
+        if not messages:
+            return
+        yield from channel._task_chat_format_messages(messages)
+        last_id = messages[-1]['id']
+        # Drop the batch from the ORM cache
+        env.invalidate_all()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable buffer that is drained after each write."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_chat_export(registry, uid, context, task_ids, fmt, with_attachments=False):
+    """Generate the export of the chats of ``task_ids`` chunk by chunk.
+
+    The generator runs after the request cursor has been closed, so it
+    opens its own. With ``with_attachments`` the transcript and the
+    attachment files are streamed as a zip archive.
+    """
+    writer = EXPORT_WRITERS[fmt]()
+    with registry.cursor(readonly=True) as cr:
+        env = api.Environment(cr, uid, context)
+        tasks = env['project.task'].browse(task_ids)
+
+        def transcript():
+            yield writer.header()
+            for task in tasks:
+                for msg in iter_task_messages(env, task):
+                    row = _export_row(task, msg)
+                    if with_attachments:
+                        attachment_ids.extend(att['id'] for att in row['attachments'])
+                    yield writer.row(row)
+            yield writer.footer()
+
+        attachment_ids = []
+        if not with_attachments:
+            for chunk in transcript():
+                if chunk:
+                    yield chunk.encode()
+            return
+
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            with archive.open('transcript.%s' % writer.extension, 'w', force_zip64=True) as entry:
+                for chunk in transcript():
+                    entry.write(chunk.encode())
+                    yield sink.drain()
+            Attachment = env['ir.attachment'].sudo()
+            for attachment_id in dict.fromkeys(attachment_ids):
+                attachment = Attachment.browse(attachment_id).exists()
+                if not attachment:
+                    continue
+                name = 'attachments/%s_%s' % (attachment.id, (attachment.name or '').replace('/', '_'))
+                with archive.open(name, 'w', force_zip64=True) as entry:
+                    entry.write(attachment.raw or b'')
+                yield sink.drain()
+                env.invalidate_all()
+        yield sink.drain()
@@ -0,0 +1,338 @@
+import atexit
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from odoo.tools import config
+
+if os.name == 'posix':
+    import fcntl
+else:
+    fcntl = None
+
+_logger = logging.getLogger(__name__)
+
+# Latency histogram upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Seconds between two writes of a process's totals to its metrics file
+FLUSH_INTERVAL = 5
+RETIRED_FILE = 'retired.json'
+
+
+def _sql_count(cr):
+    """Number of queries executed so far on this cursor (0 if unavailable)."""
+    return getattr(cr, 'sql_log_count', 0) if cr is not None else 0
+
+
+class _Totals:
+    """Aggregated chat route timings, mergeable and JSON-serializable."""
+
+    def __init__(self):
+        self.requests = {}   # (route, status) -> count
+        self.latency = {}    # route -> [bucket counts..., +Inf count, sum]
+        self.sql = {}        # route -> total queries
+        self.stages = {}     # (route, stage) -> [count, seconds, queries]
+
+    def observe(self, timer):
+        key = (timer.route, timer.status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+
+        hist = self.latency.setdefault(timer.route, [0] * (len(LATENCY_BUCKETS) + 2))
+        for idx, bound in enumerate(LATENCY_BUCKETS):
+            if timer.duration <= bound:
+                hist[idx] += 1
+        hist[-2] += 1
+        hist[-1] += timer.duration
+
+        self.sql[timer.route] = self.sql.get(timer.route, 0) + timer.sql_count
+
+        for name, duration, queries in timer.stages:
+            stage = self.stages.setdefault((timer.route, name), [0, 0.0, 0])
+            stage[0] += 1
+            stage[1] += duration
+            stage[2] += queries
+
+    def merge(self, other):
+        for key, count in other.requests.items():
+            self.requests[key] = self.requests.get(key, 0) + count
+        for route, hist in other.latency.items():
+            mine = self.latency.setdefault(route, [0] * (len(LATENCY_BUCKETS) + 2))
+            for idx, value in enumerate(hist):
+                mine[idx] += value
+        for route, count in other.sql.items():
+            self.sql[route] = self.sql.get(route, 0) + count
+        for key, values in other.stages.items():
+            mine = self.stages.setdefault(key, [0, 0.0, 0])
+            for idx, value in enumerate(values):
+                mine[idx] += value
+
+    def to_json(self):
+        return {
+            'requests': [[route, status, count] for (route, status), count in self.requests.items()],
+            'latency': [[route] + hist for route, hist in self.latency.items()],
+            'sql': [[route, count] for route, count in self.sql.items()],
+            'stages': [[route, stage] + values for (route, stage), values in self.stages.items()],
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        totals = cls()
+        totals.requests = {(route, status): count for route, status, count in data['requests']}
+        totals.latency = {row[0]: row[1:] for row in data['latency']}
+        totals.sql = {route: count for route, count in data['sql']}
+        totals.stages = {(row[0], row[1]): row[2:] for row in data['stages']}
+        return totals
+
+    def render(self):
+        lines = [
+            '# HELP project_ai_solver_requests_total Chat requests handled, by route and status.',
+            '# TYPE project_ai_solver_requests_total counter',
+        ]
+        for (route, status), count in sorted(self.requests.items()):
+            lines.append('project_ai_solver_requests_total{route="%s",status="%s"} %d' % (route, status, count))
+
+        lines += [
+            '# HELP project_ai_solver_request_duration_seconds Chat request latency, by route.',
+            '# TYPE project_ai_solver_request_duration_seconds histogram',
+        ]
+        for route, hist in sorted(self.latency.items()):
+            for idx, bound in enumerate(LATENCY_BUCKETS):
+                lines.append('project_ai_solver_request_duration_seconds_bucket{route="%s",le="%s"} %d' % (route, bound, hist[idx]))
+            lines.append('project_ai_solver_request_duration_seconds_bucket{route="%s",le="+Inf"} %d' % (route, hist[-2]))
+            lines.append('project_ai_solver_request_duration_seconds_sum{route="%s"} %.6f' % (route, hist[-1]))
+            lines.append('project_ai_solver_request_duration_seconds_count{route="%s"} %d' % (route, hist[-2]))
+
+        lines += [
+            '# HELP project_ai_solver_sql_queries_total SQL queries issued by chat requests, by route.',
+            '# TYPE project_ai_solver_sql_queries_total counter',
+        ]
+        for route, count in sorted(self.sql.items()):
+            lines.append('project_ai_solver_sql_queries_total{route="%s"} %d' % (route, count))
+
+        lines += [
+            '# HELP project_ai_solver_stage_seconds_total Time spent per request stage.',
+            '# TYPE project_ai_solver_stage_seconds_total counter',
+        ]
+        for (route, stage), (_count, seconds, _queries) in sorted(self.stages.items()):
+            lines.append('project_ai_solver_stage_seconds_total{route="%s",stage="%s"} %.6f' % (route, stage, seconds))
+        lines += [
+            '# HELP project_ai_solver_stage_sql_queries_total SQL queries issued per request stage.',
+            '# TYPE project_ai_solver_stage_sql_queries_total counter',
+        ]
+        for (route, stage), (_count, _seconds, queries) in sorted(self.stages.items()):
+            lines.append('project_ai_solver_stage_sql_queries_total{route="%s",stage="%s"} %d' % (route, stage, queries))
+        lines += [
+            '# HELP project_ai_solver_stage_calls_total Number of times each request stage ran.',
+            '# TYPE project_ai_solver_stage_calls_total counter',
+        ]
+        for (route, stage), (count, _seconds, _queries) in sorted(self.stages.items()):
+            lines.append('project_ai_solver_stage_calls_total{route="%s",stage="%s"} %d' % (route, stage, count))
+        return '\n'.join(lines) + '\n'
+
+
+class ChatMetrics:
+    """Aggregation of chat route timings shared by all worker processes.
+
+    Each process aggregates in memory and periodically writes its totals to
+    its own file in ``directory``; rendering merges the files of all
+    processes, so any worker answers a scrape with the totals of the whole
+    server. Files of workers that exited are folded into ``retired.json`` so
+    that counters never go down when workers are recycled. Liveness is
+    checked with local pids, so ``directory`` must only be used by the
+    processes of one host. Without a ``directory``, only the current
+    process is reported.
+    """
+
+    def __init__(self, directory=None, flush_interval=FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pid = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            if self._pid == os.getpid() and self._path and os.path.exists(self._path):
+                os.remove(self._path)
+            self._start_process()
+
+    def _start_process(self):
+        # Workers are forked from the server process: totals inherited from
+        # it are not theirs, and each process writes to a file of its own
+        # (the random suffix avoids reusing the file of a former worker
+        # that had the same pid).
+        self._pid = os.getpid()
+        self._path = self.directory and os.path.join(
+            self.directory, '%d-%s.json' % (self._pid, uuid.uuid4().hex[:8]),
+        )
+        self._totals = _Totals()
+        self._dirty = False
+        self._flushed = time.monotonic()
+
+    def observe(self, timer):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start_process()
+            self._totals.observe(timer)
+            self._dirty = True
+            if time.monotonic() - self._flushed >= self.flush_interval:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                self._flush()
+
+    def _flush(self):
+        self._flushed = time.monotonic()
+        if not self._path or not self._dirty:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            _write_json(self._path, self._totals.to_json())
+            self._dirty = False
+        except OSError:
+            _logger.warning("Could not write chat metrics to %s", self._path, exc_info=True)
+
+    def render_prometheus(self):
+        """Render the metrics of all processes in Prometheus text exposition format."""
+        totals = _Totals()
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start_process()
+            totals.merge(self._totals)
+            self._flush()
+        if self.directory and os.path.isdir(self.directory):
+            totals.merge(self._collect_others())
+        return totals.render()
+
+    def _collect_others(self):
+        """Merge the totals written by the other processes, folding those of
+        dead processes into the retired totals."""
+        totals = _Totals()
+        with _directory_lock(self.directory):
+            retired_path = os.path.join(self.directory, RETIRED_FILE)
+            retired = _read_totals(retired_path) or _Totals()
+            dead = []
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if path == self._path or not name.endswith('.json') or name == RETIRED_FILE:
+                    continue
+                worker = _read_totals(path)
+                if worker is None:
+                    continue
+                if _pid_alive(int(name.split('-', 1)[0])):
+                    totals.merge(worker)
+                else:
+                    retired.merge(worker)
+                    dead.append(path)
+            if dead:
+                _write_json(retired_path, retired.to_json())
+                for path in dead:
+                    os.remove(path)
+            totals.merge(retired)
+        return totals
+
+
+def _write_json(path, data):
+    tmp_path = '%s.tmp' % path
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def _read_totals(path):
+    try:
+        with open(path) as f:
+            return _Totals.from_json(json.load(f))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError):
+        _logger.warning("Ignoring unreadable chat metrics file %s", path, exc_info=True)
+        return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@contextmanager
+def _directory_lock(directory):
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+# data_dir is often shared between the nodes of a deployment: one directory per host
+METRICS = ChatMetrics(os.path.join(config['data_dir'], 'project_ai_solver', 'metrics', socket.gethostname()))
+atexit.register(METRICS.flush)
+
+
+class RouteTimer:
+    """Collect per-stage wall time and SQL query counts for one request."""
+
+    def __init__(self, route, cr=None):
+        self.route = route
+        self.cr = cr
+        self.stages = []
+        self.status = 'ok'
+        self.duration = 0.0
+        self.sql_count = 0
+        self._start = time.perf_counter()
+        self._sql_start = _sql_count(cr)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        sql_start = _sql_count(self.cr)
+        try:
+            yield
+        finally:
+            self.stages.append((
+                name,
+                time.perf_counter() - start,
+                _sql_count(self.cr) - sql_start,
+            ))
+
+    def finish(self, status=None):
+        if status:
+            self.status = status
+        self.duration = time.perf_counter() - self._start
+        self.sql_count = _sql_count(self.cr) - self._sql_start
+        METRICS.observe(self)
+
+    def server_timing(self):
+        """Format the collected stages as a ``Server-Timing`` header value."""
+        entries = [
+            '%s;dur=%.1f;desc="%d queries"' % (name, duration * 1000, queries)
+            for name, duration, queries in self.stages
+        ]
+        entries.append('total;dur=%.1f;desc="%d queries"' % (self.duration * 1000, self.sql_count))
+        return ', '.join(entries)
+
+
+@contextmanager
+def stage(timer, name):
+    """Time ``name`` on ``timer`` if there is one, do nothing otherwise."""
+    if timer is None:
+        yield
+    else:
+        with timer.stage(name):
+            yield
@@ -0,0 +1,55 @@
+import calendar
+from datetime import datetime
+
+from odoo.tools import DEFAULT_SERVER_DATETIME_FORMAT
+
+COMPACT_MESSAGE_FIELDS = ['id', 'body', 'author_id', 'date', 'attachment_ids']
+
+
+def _timestamp(value):
+    """UTC server datetime string to integer epoch seconds."""
+    if not value:
+        return 0
+    return calendar.timegm(datetime.strptime(value, DEFAULT_SERVER_DATETIME_FORMAT).timetuple())
+
+
+def compact_history(payload):
+    """Convert a chat history payload into its compact wire format.
+
+    Authors and attachments are deduplicated into lookup tables keyed by
+    id, and each message becomes a row following ``fields``, with its date
+    as epoch seconds::
+
+        {
+            'format': 'compact',
+            'fields': ['id', 'body', 'author_id', 'date', 'attachment_ids'],
+            'authors': {id: name},
+            'attachments': {id: {'name', 'mimetype', 'file_size', 'access_token', 'is_image'}},
+            'messages': [[id, body, author_id or 0, timestamp, [attachment ids]], ...],
+        }
+    """
+    authors = {}
+    attachments = {}
+    rows = []
+    for msg in payload['messages']:
+        author_id = 0
+        if msg.get('author_id'):
+            author_id, authors[author_id] = msg['author_id'][0], msg['author_id'][1]
+        for att in msg.get('attachments', []):
+            attachments[att['id']] = {key: value for key, value in att.items() if key != 'id'}
+        rows.append([
+            msg['id'],
+            msg.get('body') or '',
+            author_id,
+            _timestamp(msg.get('date')),
+            [att['id'] for att in msg.get('attachments', [])],
+        ])
+    compact = {key: value for key, value in payload.items() if key != 'messages'}
+    compact.update({
+        'format': 'compact',
+        'fields': COMPACT_MESSAGE_FIELDS,
+        'authors': authors,
+        'attachments': attachments,
+        'messages': rows,
+    })
+    return compact
@@ -0,0 +1,123 @@
+import copy
+import threading
+import time
+
+# Stale buckets are dropped once the table grows beyond this size
+MAX_BUCKETS = 10000
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, at most ``burst``."""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now=None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic() if now is None else now
+
+    def consume(self, now):
+        """Take one token. Return 0 if allowed, else seconds until the next token."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Per-process token buckets keyed by an arbitrary hashable key.
+
+    With Odoo's prefork server every worker keeps its own buckets, so the
+    effective limit is the configured one times the number of workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def hit(self, key, rate, burst):
+        """Consume one token for ``key``; return 0 or the retry delay in seconds."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or bucket.rate != rate or bucket.burst != burst:
+                if len(self._buckets) >= MAX_BUCKETS:
+                    self._prune(now)
+                bucket = self._buckets[key] = TokenBucket(rate, burst, now)
+            return bucket.consume(now)
+
+    def refund(self, key):
+        """Give back the token taken by a request that was rejected later on."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.tokens = min(bucket.burst, bucket.tokens + 1)
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def _prune(self, now):
+        # A bucket that had time to refill completely is equivalent to a new one
+        full = [
+            key for key, bucket in self._buckets.items()
+            if bucket.tokens + (now - bucket.updated) * bucket.rate >= bucket.burst
+        ]
+        for key in full:
+            del self._buckets[key]
+        if len(self._buckets) >= MAX_BUCKETS:
+            self._buckets.clear()
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestCoalescer:
+    """Share one computation between concurrent callers using the same key.
+
+    The first caller computes the result; callers arriving while it runs
+    wait for it and receive a copy. Only requests served by threads of the
+    same process can be coalesced (threaded/gevent servers).
+    """
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def run(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if leader:
+            try:
+                call.result = func()
+                return call.result
+            except Exception as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.event.set()
+
+        # Fall back to computing our own result if the leader failed or stalled
+        if not call.event.wait(self.timeout) or call.error is not None:
+            return func()
+        return copy.deepcopy(call.result)
+
+
+RATE_LIMITER = RateLimiter()
+HISTORY_COALESCER = RequestCoalescer()